@@ -0,0 +1,44 @@
+"""add chat token counts and session summaries
+
+Revision ID: 3b7c1e9d4f20
+Revises: 9e214882a301
+Create Date: 2026-10-17 09:12:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1e9d4f20'
+down_revision: Union[str, None] = '9e214882a301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_messages', sa.Column('token_count', sa.Integer(), nullable=True))
+    # Same estimate as server.services.chat_history.estimate_tokens
+    op.execute("UPDATE chat_messages SET token_count = length(content) / 4 + 4")
+    op.create_table(
+        'chat_session_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=50), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('summarized_through_id', sa.Integer(), nullable=True),
+        sa.Column('token_count', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'session_id', name='uq_chat_summary_user_session'),
+    )
+    op.create_index(op.f('ix_chat_session_summaries_user_id'), 'chat_session_summaries', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chat_session_summaries_user_id'), table_name='chat_session_summaries')
+    op.drop_table('chat_session_summaries')
+    op.drop_column('chat_messages', 'token_count')
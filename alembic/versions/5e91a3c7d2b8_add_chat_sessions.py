@@ -0,0 +1,54 @@
+"""add chat_sessions index table
+
+Revision ID: 5e91a3c7d2b8
+Revises: 7c2d5e8a1b36
+Create Date: 2026-10-17 13:26:51.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e91a3c7d2b8'
+down_revision: Union[str, None] = '7c2d5e8a1b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chat_sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=80), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'session_id', name='uq_chat_session_user_session'),
+    )
+    op.create_index(
+        'ix_chat_sessions_user_last_message', 'chat_sessions',
+        ['user_id', 'last_message_at', 'id'], unique=False,
+    )
+    # Backfill from existing messages; the title is the session's first user message
+    op.execute("""
+        INSERT INTO chat_sessions (user_id, session_id, title, started_at, last_message_at, message_count)
+        SELECT m.user_id, m.session_id,
+               (SELECT substr(f.content, 1, 80) FROM chat_messages f
+                 WHERE f.user_id = m.user_id AND f.session_id = m.session_id AND f.role = 'user'
+                 ORDER BY f.id LIMIT 1),
+               min(m.created_at), max(m.created_at), count(*)
+          FROM chat_messages m
+         GROUP BY m.user_id, m.session_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_sessions_user_last_message', table_name='chat_sessions')
+    op.drop_table('chat_sessions')
@@ -0,0 +1,29 @@
+"""add users.token_version
+
+Revision ID: 6c3e8f1a2d94
+Revises: d82b4f1e6a57
+Create Date: 2026-10-17 21:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3e8f1a2d94'
+down_revision: Union[str, None] = 'd82b4f1e6a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,29 @@
+"""add truncated flag to chat messages
+
+Revision ID: 7c2d5e8a1b36
+Revises: 3b7c1e9d4f20
+Create Date: 2026-10-17 11:02:17.530981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d5e8a1b36'
+down_revision: Union[str, None] = '3b7c1e9d4f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'chat_messages',
+        sa.Column('truncated', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('chat_messages', 'truncated')
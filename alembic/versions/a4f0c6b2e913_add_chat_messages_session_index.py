@@ -0,0 +1,28 @@
+"""add (user_id, session_id, created_at) index to chat messages
+
+Revision ID: a4f0c6b2e913
+Revises: 5e91a3c7d2b8
+Create Date: 2026-10-17 14:03:38.771260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f0c6b2e913'
+down_revision: Union[str, None] = '5e91a3c7d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_chat_messages_user_session_created', 'chat_messages',
+        ['user_id', 'session_id', 'created_at', 'id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_user_session_created', table_name='chat_messages')
@@ -0,0 +1,48 @@
+"""add chat_memories and chat_sessions.memorized_at
+
+Revision ID: d82b4f1e6a57
+Revises: a4f0c6b2e913
+Create Date: 2026-10-17 18:04:12.531907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd82b4f1e6a57'
+down_revision: Union[str, None] = 'a4f0c6b2e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("memorized_at IS NULL OR memorized_at < last_message_at")
+
+
+def upgrade() -> None:
+    op.add_column('chat_sessions', sa.Column('memorized_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_chat_sessions_memory_pending', 'chat_sessions', ['last_message_at'],
+        unique=False, postgresql_where=PENDING, sqlite_where=PENDING,
+    )
+    op.create_table(
+        'chat_memories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=50), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_chat_memories_user_session', 'chat_memories', ['user_id', 'session_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_memories_user_session', table_name='chat_memories')
+    op.drop_table('chat_memories')
+    op.drop_index('ix_chat_sessions_memory_pending', table_name='chat_sessions')
+    op.drop_column('chat_sessions', 'memorized_at')
@@ -0,0 +1,75 @@
+"""
+Event-loop lag during a burst of logins, with bcrypt inline vs on the pool.
+
+A monitor task sleeps --tick-ms at a time and records how late it wakes up,
+which is how late every SSE frame on the worker would be. Meanwhile --logins
+concurrent password checks run two ways:
+
+- inline: bcrypt.checkpw called directly in the coroutine (the old behaviour)
+- pool: server.auth.verify_password, which runs on the bcrypt thread pool
+
+Each mode prints the median and worst wake-up lag, the total time the loop
+was late and how long the burst took, then the pool's bcrypt_stats().
+
+Usage:
+    python -m bench.bcrypt_lag --logins 50 --rounds 12 --threads 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+
+async def _monitor(tick: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append((time.perf_counter() - start - tick) * 1000)
+
+
+async def _burst(label: str, check, args, hashed: str):
+    lags: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor(args.tick_ms / 1000, lags, stop))
+    await asyncio.sleep(args.tick_ms / 1000 * 5)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(check("correct horse", hashed) for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    assert all(results)
+
+    lags.sort()
+    print(
+        f"{label:<7} burst {elapsed * 1000:8.0f} ms   lag p50 {statistics.median(lags):7.1f} ms"
+        f"   max {lags[-1]:7.1f} ms   stalled {sum(lags):7.0f} ms"
+    )
+
+
+async def main(args):
+    import bcrypt
+    from server.config import settings
+    from server import auth
+
+    settings.BCRYPT_ROUNDS = args.rounds
+    settings.BCRYPT_MAX_THREADS = args.threads
+    hashed = await auth.hash_password("correct horse")
+
+    async def inline(plain, hashed):
+        return bcrypt.checkpw(plain.encode(), hashed.encode())
+
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, {args.threads} pool threads")
+    await _burst("inline", inline, args, hashed)
+    await _burst("pool", auth.verify_password, args, hashed)
+    print(f"        {auth.bcrypt_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--threads", type=int, default=2, help="BCRYPT_MAX_THREADS")
+    parser.add_argument("--tick-ms", type=float, default=5, help="monitor sleep interval")
+    asyncio.run(main(parser.parse_args()))
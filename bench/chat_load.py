@@ -0,0 +1,199 @@
+"""
+Load test for /api/chat/stream with N concurrent simulated users.
+
+Runs the API and bench.fake_ollama in this process (or points the API at a real
+Ollama with --ollama-url). Each simulated user has their own account and chat
+session and sends a message, reads the whole stream, waits --think-ms and goes
+again until --duration runs out. Reports:
+
+- time to first token and full-response latency (p50/p95/p99)
+- tokens/s per stream and overall (tokens = whitespace-separated words received)
+- responses/s, HTTP errors and 429s from the LLM scheduler
+- DB pool connections checked out and LLM queue depth, sampled every 50 ms
+
+Usage:
+    python -m bench.chat_load --users 20 --duration 30
+    python -m bench.chat_load --users 50 --tokens-per-second 30 --ttft-ms 400 --drop-rate 0.05
+    python -m bench.chat_load --database-url postgresql://localhost/productivity_hub_bench --ollama-url http://gpu-box:11434
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from bench.fake_ollama import add_arguments
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _bench_tokens(AsyncSessionLocal, count: int) -> list[str]:
+    from sqlalchemy import select
+    from server.auth import create_access_token
+    from server.models import User
+
+    emails = [f"bench-load-{i}@example.com" for i in range(count)]
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email.in_(emails)))
+        users = {u.email: u for u in result.scalars().all()}
+        for email in emails:
+            if email not in users:
+                users[email] = User(name="Bench", email=email, password_hash="x")
+                db.add(users[email])
+        await db.commit()
+    return [create_access_token(users[email].id, users[email].token_version) for email in emails]
+
+
+class Results:
+    def __init__(self):
+        self.ttft = []
+        self.latency = []
+        self.stream_rates = []
+        self.tokens = 0
+        self.responses = 0
+        self.errors = 0
+        self.rejected = 0
+
+
+async def _simulated_user(client, token: str, deadline: float, think: float, results: Results):
+    headers = {"Authorization": f"Bearer {token}"}
+    session_id = str(uuid.uuid4())
+    turn = 0
+    while time.perf_counter() < deadline:
+        turn += 1
+        start = time.perf_counter()
+        first = None
+        words = 0
+        try:
+            async with client.stream(
+                "POST", "/api/chat/stream", headers=headers,
+                json={"message": f"Message {turn}: what should I work on next?", "sessionId": session_id},
+            ) as resp:
+                if resp.status_code == 429:
+                    results.rejected += 1
+                    await asyncio.sleep(float(resp.headers.get("Retry-After", 1)))
+                    continue
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if line.startswith('data: {"token"'):
+                        if first is None:
+                            first = time.perf_counter()
+                        words += len(json.loads(line[6:])["token"].split())
+        except Exception:
+            results.errors += 1
+            continue
+
+        end = time.perf_counter()
+        results.responses += 1
+        results.latency.append((end - start) * 1000)
+        results.tokens += words
+        if first is not None:
+            results.ttft.append((first - start) * 1000)
+            if end > first:
+                results.stream_rates.append(words / (end - first))
+        await asyncio.sleep(think)
+
+
+async def _sample(engine, scheduler, samples: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        samples["pool"].append(engine.pool.checkedout())
+        samples["queued"].append(scheduler.queued)
+        await asyncio.sleep(0.05)
+
+
+async def main(args):
+    import httpx
+    from server.database import engine, AsyncSessionLocal
+    from server.main import app
+    from server.models.base import Base
+    from server.services.llm_scheduler import llm_scheduler
+    from bench.fake_ollama import app_from_args, serve
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    tokens = await _bench_tokens(AsyncSessionLocal, args.users)
+
+    servers = []
+    fake_app = None
+    if not args.ollama_url:
+        fake_app = app_from_args(args)
+        servers.append(await serve(fake_app, args.ollama_port))
+    servers.append(await serve(app, args.port))
+
+    results = Results()
+    samples = {"pool": [], "queued": []}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample(engine, llm_scheduler, samples, stop))
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}", timeout=None, limits=limits
+    ) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            _simulated_user(client, token, deadline, args.think_ms / 1000, results)
+            for token in tokens
+        ))
+        elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+
+    for server, task in servers:
+        server.should_exit = True
+        await task
+    await engine.dispose()
+
+    print(
+        f"{args.users} users, {elapsed:.1f} s, LLM_MAX_CONCURRENCY={llm_scheduler.max_concurrency}, "
+        f"pool size {engine.pool.size()} + overflow"
+    )
+    print(
+        f"responses   {results.responses} ({results.responses / elapsed:.1f}/s), "
+        f"errors {results.errors}, rejected (429) {results.rejected}"
+    )
+    for label, values in (("TTFT", results.ttft), ("latency", results.latency)):
+        print(
+            f"{label:<11} p50 {_percentile(values, 50):8.1f} ms   "
+            f"p95 {_percentile(values, 95):8.1f} ms   p99 {_percentile(values, 99):8.1f} ms"
+        )
+    stream_rate = statistics.median(results.stream_rates) if results.stream_rates else 0
+    print(
+        f"tokens/s    {results.tokens / elapsed:.0f} overall, {stream_rate:.1f} per stream (p50)"
+    )
+    print(
+        f"DB pool     checked out peak {max(samples['pool'], default=0)}, "
+        f"mean {statistics.mean(samples['pool']) if samples['pool'] else 0:.2f}"
+    )
+    print(
+        f"LLM queue   peak {max(samples['queued'], default=0)}, "
+        f"mean {statistics.mean(samples['queued']) if samples['queued'] else 0:.2f}"
+    )
+    if fake_app is not None:
+        print(f"fake ollama {fake_app.state.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL from the environment/.env")
+    parser.add_argument("--ollama-url", help="use a real Ollama instead of the in-process fake")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=500, help="pause between a user's messages")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--ollama-port", type=int, default=18001)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    from server.config import settings
+
+    if args.database_url:
+        settings.DATABASE_URL = args.database_url
+    settings.OLLAMA_BASE_URL = args.ollama_url or f"http://127.0.0.1:{args.ollama_port}"
+    asyncio.run(main(args))
@@ -0,0 +1,200 @@
+"""
+Micro-benchmark: sequential vs concurrent build_context on a cold cache.
+
+Seeds a dedicated benchmark user into a local database (created if missing),
+then times a full context rebuild both ways:
+
+- sequential: every section awaited in turn on one AsyncSession (the old behaviour)
+- concurrent: build_context() with an empty cache, which fans sections out
+  over separate pooled connections
+
+Usage:
+    python -m bench.context_build --database-url postgresql://localhost/productivity_hub_bench
+    python -m bench.context_build --latency-ms 1 --iterations 200
+
+The win comes from overlapping round trips, so it shows up once the database is
+a network hop away. Against a Postgres on the same host, --latency-ms routes the
+connections through a local proxy that delays every packet by that much in each
+direction. SQLite serialises access, so expect no difference there.
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_EMAIL = "bench-context@example.com"
+
+
+async def _seed(AsyncSessionLocal):
+    from sqlalchemy import select
+    from server.models import (
+        User, Goal, JournalEntry, HabitLog, CustomHabit, CustomHabitLog,
+        CalendarEvent, Note, FocusSession,
+    )
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == BENCH_EMAIL))
+        user = result.scalar_one_or_none()
+        if user:
+            return user.id
+
+        user = User(name="Bench", email=BENCH_EMAIL, password_hash="x")
+        db.add(user)
+        await db.flush()
+
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        for i in range(20):
+            db.add(Goal(user_id=user.id, title=f"Goal {i}", status="active", progress=i * 5))
+        for i in range(60):
+            db.add(JournalEntry(
+                user_id=user.id,
+                date=today - timedelta(days=i),
+                morning_intentions="<p>" + "Plan the day carefully. " * 10 + "</p>",
+                content="<p>" + "Wrote some things down. " * 20 + "</p>",
+                evening_reflection="<p>" + "It went fine overall. " * 10 + "</p>",
+            ))
+        for i in range(60):
+            db.add(HabitLog(
+                user_id=user.id, date=today - timedelta(days=i), category="sleep",
+                data='{"hours": 7, "quality": 4}',
+            ))
+        habits = [CustomHabit(user_id=user.id, name=f"Habit {i}", tracking_type="checkbox") for i in range(8)]
+        db.add_all(habits)
+        await db.flush()
+        for h in habits:
+            db.add(CustomHabitLog(user_id=user.id, date=today, custom_habit_id=h.id, value="true"))
+        for i in range(200):
+            start = now + timedelta(hours=i * 3 - 300)
+            db.add(CalendarEvent(
+                user_id=user.id, title=f"Event {i}", start=start, end=start + timedelta(hours=1),
+            ))
+        for i in range(300):
+            db.add(Note(user_id=user.id, title=f"Note {i}", content="<p>" + "Some note text. " * 40 + "</p>"))
+        for i in range(200):
+            db.add(FocusSession(
+                user_id=user.id, title=f"Focus {i}", planned_duration=1500,
+                actual_duration=1500, status="completed",
+            ))
+        await db.commit()
+        return user.id
+
+
+def _start_latency_proxy(database_url: str, latency_ms: float) -> str:
+    """Run a delaying TCP proxy in a background thread; return the URL to use instead."""
+    from sqlalchemy.engine import make_url
+
+    url = make_url(database_url)
+    socket_dir = url.query.get("host")
+    port = url.port or 5432
+    delay = latency_ms / 1000
+    ready = threading.Event()
+    bound = {}
+
+    async def pipe(reader, writer):
+        try:
+            while data := await reader.read(65536):
+                await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        if socket_dir:
+            upstream = await asyncio.open_unix_connection(f"{socket_dir}/.s.PGSQL.{port}")
+        else:
+            upstream = await asyncio.open_connection(url.host or "localhost", port)
+        server_reader, server_writer = upstream
+        await asyncio.gather(
+            pipe(client_reader, server_writer), pipe(server_reader, client_writer)
+        )
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        bound["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    proxied = url.set(host="127.0.0.1", port=bound["port"]).difference_update_query(["host"])
+    return proxied.render_as_string(hide_password=False)
+
+
+async def _sequential(AsyncSessionLocal, sections, user_id):
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for _, builder in sections:
+            await builder(db, user_id, now)
+
+
+async def _concurrent(AsyncSessionLocal, build_context, context_cache, user_id):
+    context_cache.drop_sections(user_id)
+    async with AsyncSessionLocal() as db:
+        await build_context(db, user_id)
+
+
+async def _time(label, fn, iterations):
+    await fn()  # warm the pool and statement caches
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<11} mean {statistics.mean(samples):7.2f} ms   "
+        f"p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+    return statistics.median(samples)
+
+
+async def main(args):
+    from server.database import engine, AsyncSessionLocal
+    from server.models.base import Base
+    import server.models  # noqa: F401 — register all models
+    from server.services import context_cache
+    from server.services.context_builder import SECTIONS, build_context
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    user_id = await _seed(AsyncSessionLocal)
+
+    print(f"build_context cold-cache rebuild, {args.iterations} iterations")
+    seq = await _time(
+        "sequential", lambda: _sequential(AsyncSessionLocal, SECTIONS, user_id), args.iterations
+    )
+    conc = await _time(
+        "concurrent",
+        lambda: _concurrent(AsyncSessionLocal, build_context, context_cache, user_id),
+        args.iterations,
+    )
+    print(f"speedup (p50): {seq / conc:.2f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL from the environment/.env")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0,
+        help="simulated one-way network delay to a Postgres database",
+    )
+    args = parser.parse_args()
+
+    from server.config import settings
+
+    if args.database_url:
+        settings.DATABASE_URL = args.database_url
+    if args.latency_ms:
+        settings.DATABASE_URL = _start_latency_proxy(settings.DATABASE_URL, args.latency_ms)
+    # server.database builds its engine from settings on import, inside main()
+    asyncio.run(main(args))
@@ -0,0 +1,146 @@
+"""
+A stand-in for Ollama's /api/chat so the chat path can be benchmarked without a GPU.
+
+Streams canned tokens at a configurable rate after a configurable
+time-to-first-token, answers non-streaming requests in the time the same reply
+would take to stream, and can inject faults:
+
+- --error-rate: fraction of requests answered with HTTP 500
+- --drop-rate: fraction of streams cut off halfway through the reply
+- --stall-rate: fraction of streams that stop sending for --stall-ms halfway through
+
+    python -m bench.fake_ollama --port 11435 --tokens-per-second 40 --ttft-ms 300
+    OLLAMA_BASE_URL=http://localhost:11435 uvicorn server.main:app
+
+The benchmarks also import create_app()/serve() to run it in-process. The app
+keeps request and fault counters in app.state.stats.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+class DroppedStream(Exception):
+    """Raised inside a streaming body to make the server abort the connection."""
+
+
+def create_app(
+    tokens: int = 50,
+    tokens_per_second: float = 50,
+    ttft_ms: float = 0,
+    error_rate: float = 0.0,
+    drop_rate: float = 0.0,
+    stall_rate: float = 0.0,
+    stall_ms: float = 5000,
+    seed: int | None = None,
+) -> Starlette:
+    """Build the fake server. tokens_per_second <= 0 streams as fast as possible."""
+    rng = random.Random(seed)
+    delay = 1 / tokens_per_second if tokens_per_second > 0 else 0
+    stats = {"requests": 0, "errors": 0, "drops": 0, "stalls": 0}
+
+    async def chat(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        words = [f"word{i} " for i in range(tokens)]
+
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+
+        if not body.get("stream", True):
+            await asyncio.sleep(ttft_ms / 1000 + delay * tokens)
+            return JSONResponse({
+                "model": body.get("model"),
+                "message": {"role": "assistant", "content": "".join(words)},
+                "done": True,
+            })
+
+        drop = rng.random() < drop_rate
+        stall = rng.random() < stall_rate
+
+        async def generate():
+            await asyncio.sleep(ttft_ms / 1000)
+            for i, word in enumerate(words):
+                if i == tokens // 2:
+                    if drop:
+                        stats["drops"] += 1
+                        raise DroppedStream()
+                    if stall:
+                        stats["stalls"] += 1
+                        await asyncio.sleep(stall_ms / 1000)
+                if i:
+                    await asyncio.sleep(delay)
+                chunk = {"message": {"role": "assistant", "content": word}, "done": False}
+                yield json.dumps(chunk) + "\n"
+            yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    async def tags(request: Request):
+        return JSONResponse({"models": []})
+
+    app = Starlette(routes=[
+        Route("/api/chat", chat, methods=["POST"]),
+        Route("/api/tags", tags),
+    ])
+    app.state.stats = stats
+    return app
+
+
+async def serve(app, port: int):
+    """Start uvicorn for app on 127.0.0.1 inside the running loop.
+
+    Returns (server, task); set server.should_exit and await task to stop it.
+    """
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="critical", lifespan="off")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Fake-server options, shared with the benchmarks that embed it."""
+    parser.add_argument("--tokens", type=int, default=50, help="tokens per reply")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="0 = unthrottled")
+    parser.add_argument("--ttft-ms", type=float, default=0, help="delay before the first token")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-ms", type=float, default=5000)
+    parser.add_argument("--seed", type=int)
+
+
+def app_from_args(args) -> Starlette:
+    return create_app(
+        tokens=args.tokens,
+        tokens_per_second=args.tokens_per_second,
+        ttft_ms=args.ttft_ms,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        stall_rate=args.stall_rate,
+        stall_ms=args.stall_ms,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host="127.0.0.1", port=args.port)
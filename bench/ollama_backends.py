@@ -0,0 +1,102 @@
+"""
+Exercise the multi-backend Ollama router against several bench.fake_ollama copies.
+
+Starts --backends fake servers in this process (the last one --slow-factor
+times slower than the rest) and drives ollama_service.stream_ollama_response
+from --concurrency workers through three phases:
+
+1. all backends up: requests should favour the faster backends
+2. backend 0 stopped: it is ejected and traffic moves to the others
+3. backend 0 restarted: after OLLAMA_EJECT_SECONDS it gets traffic again
+
+Each phase prints the requests each fake server received, completed replies,
+and replies that came back as errors.
+
+Usage:
+    python -m bench.ollama_backends --backends 3 --phase-seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from bench.fake_ollama import add_arguments, create_app, serve
+
+
+async def _worker(deadline: float, counts: dict):
+    from server.services.ollama_service import stream_ollama_response
+
+    while time.perf_counter() < deadline:
+        tokens = [t async for t in stream_ollama_response([{"role": "user", "content": "hi"}])]
+        text = "".join(tokens)
+        if text.startswith(("AI error", "Could not connect")):
+            counts["errors"] += 1
+        else:
+            counts["replies"] += 1
+
+
+async def _phase(label: str, args, apps: list):
+    from server.services.ollama_service import backend_stats
+
+    before = [app.state.stats["requests"] for app in apps]
+    counts = {"replies": 0, "errors": 0}
+    deadline = time.perf_counter() + args.phase_seconds
+    await asyncio.gather(*(_worker(deadline, counts) for _ in range(args.concurrency)))
+    served = [app.state.stats["requests"] - b for app, b in zip(apps, before)]
+    print(f"{label:<22} replies {counts['replies']:5}  errors {counts['errors']:3}  per backend {served}")
+    for stats in backend_stats():
+        print(f"    {stats}")
+
+
+async def main(args):
+    from server.config import settings
+    from server.services.ollama_service import start_ollama_client, close_ollama_client
+
+    ports = [args.base_port + i for i in range(args.backends)]
+    apps = []
+    for i in range(args.backends):
+        rate = args.tokens_per_second
+        if i == args.backends - 1 and rate > 0:
+            rate /= args.slow_factor
+        apps.append(create_app(tokens=args.tokens, tokens_per_second=rate, ttft_ms=args.ttft_ms))
+    servers = [await serve(app, port) for app, port in zip(apps, ports)]
+
+    settings.OLLAMA_BACKENDS = json.dumps([{"url": f"http://127.0.0.1:{p}"} for p in ports])
+    settings.OLLAMA_HEALTH_INTERVAL_SECONDS = args.health_interval
+    settings.OLLAMA_EJECT_SECONDS = args.eject_seconds
+    start_ollama_client()
+
+    print(
+        f"{args.backends} backends, {args.concurrency} concurrent, {args.tokens} tokens at "
+        f"{args.tokens_per_second}/s (last backend {args.slow_factor}x slower)"
+    )
+    await _phase("all up", args, apps)
+
+    server, task = servers[0]
+    server.should_exit = True
+    await task
+    await _phase("backend 0 down", args, apps)
+
+    servers[0] = await serve(apps[0], ports[0])
+    await asyncio.sleep(args.eject_seconds)
+    await _phase("backend 0 restarted", args, apps)
+
+    await close_ollama_client()
+    for server, task in servers:
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--phase-seconds", type=float, default=5)
+    parser.add_argument("--slow-factor", type=float, default=3, help="slowdown of the last backend")
+    parser.add_argument("--health-interval", type=float, default=1.0, help="seconds between probes")
+    parser.add_argument("--eject-seconds", type=float, default=2.0)
+    parser.add_argument("--base-port", type=int, default=18101)
+    add_arguments(parser)
+    parser.set_defaults(tokens=20, tokens_per_second=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,167 @@
+"""
+Benchmark: one SSE frame per token vs coalesced token frames.
+
+Runs bench.fake_ollama in this process and the API in a uvicorn subprocess,
+once with SSE_FLUSH_INTERVAL_MS=0 (a frame per token) and once with
+--interval-ms, then streams --responses chat replies through each and
+reports:
+
+- frames/s received by the client, and frames per response
+- API process CPU time per response (from /proc, so Linux only)
+- time to first token
+
+Usage:
+    python -m bench.sse_framing --tokens 400 --tokens-per-second 0
+    python -m bench.sse_framing --database-url postgresql://localhost/productivity_hub_bench --interval-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench.fake_ollama import add_arguments
+
+BENCH_EMAIL = "bench-sse@example.com"
+
+
+def _cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of the full line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def _bench_token():
+    from sqlalchemy import select
+    from server.auth import create_access_token
+    from server.database import engine, AsyncSessionLocal
+    from server.models import User
+    from server.models.base import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == BENCH_EMAIL))
+        user = result.scalar_one_or_none()
+        if user is None:
+            user = User(name="Bench", email=BENCH_EMAIL, password_hash="x")
+            db.add(user)
+            await db.commit()
+    await engine.dispose()
+    return create_access_token(user.id, user.token_version)
+
+
+async def _start_api(args, interval_ms: int):
+    import httpx
+
+    env = dict(
+        os.environ,
+        OLLAMA_BASE_URL=f"http://127.0.0.1:{args.ollama_port}",
+        OLLAMA_WARM_ON_STARTUP="false",
+        LLM_MAX_CONCURRENCY=str(args.concurrency),
+        SSE_FLUSH_INTERVAL_MS=str(interval_ms),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.main:app",
+         "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            try:
+                await client.get(f"http://127.0.0.1:{args.port}/openapi.json")
+                return proc
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("API did not start")
+
+
+async def _one_response(client, ttfts: list) -> int:
+    frames = 0
+    start = time.perf_counter()
+    async with client.stream("POST", "/api/chat/stream", json={"message": "hello"}) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith('data: {"token"'):
+                if not frames:
+                    ttfts.append((time.perf_counter() - start) * 1000)
+                frames += 1
+    return frames
+
+
+async def _run(label, args, interval_ms, token):
+    import httpx
+
+    proc = await _start_api(args, interval_ms)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=None,
+        ) as client:
+            await _one_response(client, [])  # warm up connections and caches
+            ttfts = []
+            cpu_before = _cpu_seconds(proc.pid)
+            start = time.perf_counter()
+            frames = 0
+            for _ in range(args.responses // args.concurrency):
+                counts = await asyncio.gather(
+                    *(_one_response(client, ttfts) for _ in range(args.concurrency))
+                )
+                frames += sum(counts)
+            elapsed = time.perf_counter() - start
+            cpu = _cpu_seconds(proc.pid) - cpu_before
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    responses = len(ttfts)
+    print(
+        f"{label:<11} {frames / elapsed:9.0f} frames/s   "
+        f"{frames / responses:6.1f} frames/resp   "
+        f"{cpu / responses * 1000:6.2f} ms CPU/resp   "
+        f"TTFT p50 {statistics.median(ttfts):6.1f} ms"
+    )
+
+
+async def main(args):
+    from bench.fake_ollama import app_from_args, serve
+
+    token = await _bench_token()
+    fake, fake_task = await serve(app_from_args(args), args.ollama_port)
+
+    print(
+        f"{args.responses} responses x {args.tokens} tokens, "
+        f"{args.concurrency} concurrent, {args.tokens_per_second or 'unthrottled'} tokens/s"
+    )
+    await _run("per-token", args, 0, token)
+    await _run("coalesced", args, args.interval_ms, token)
+
+    fake.should_exit = True
+    await fake_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL from the environment/.env")
+    parser.add_argument("--responses", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--interval-ms", type=int, default=50, help="coalescing interval to compare")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--ollama-port", type=int, default=18001)
+    add_arguments(parser)
+    parser.set_defaults(tokens=400, tokens_per_second=0)
+    args = parser.parse_args()
+
+    from server.config import settings
+
+    if args.database_url:
+        settings.DATABASE_URL = args.database_url
+    # The API subprocess reads its settings from the environment
+    os.environ["DATABASE_URL"] = settings.DATABASE_URL
+    asyncio.run(main(args))
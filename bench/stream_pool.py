@@ -0,0 +1,115 @@
+"""
+Check that open chat streams do not hold database connections.
+
+Starts the API and bench.fake_ollama in-process, opens --streams concurrent
+/api/chat/stream requests, and samples engine.pool.checkedout() while every
+stream is mid-reply. The request session commits before the first token, so
+the count should stay at zero however many streams are open; the script exits
+non-zero if it does not.
+
+Usage:
+    python -m bench.stream_pool --streams 20
+    python -m bench.stream_pool --database-url postgresql://localhost/productivity_hub_bench
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from bench.fake_ollama import add_arguments
+
+BENCH_EMAIL = "bench-stream@example.com"
+
+
+async def _bench_token(AsyncSessionLocal):
+    from sqlalchemy import select
+    from server.auth import create_access_token
+    from server.models import User
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == BENCH_EMAIL))
+        user = result.scalar_one_or_none()
+        if user is None:
+            user = User(name="Bench", email=BENCH_EMAIL, password_hash="x")
+            db.add(user)
+            await db.commit()
+        return create_access_token(user.id, user.token_version)
+
+
+async def _open_stream(client, tokens: int, started: asyncio.Event, halfway: asyncio.Event):
+    async with client.stream("POST", "/api/chat/stream", json={"message": "hello"}) as resp:
+        resp.raise_for_status()
+        received = 0
+        async for line in resp.aiter_lines():
+            if line.startswith('data: {"token"'):
+                # Frames carry several tokens once coalesced; count the words
+                received += len(json.loads(line[6:])["token"].split())
+                started.set()
+                if received >= tokens // 2:
+                    halfway.set()
+
+
+async def main(args):
+    import httpx
+    from server.database import engine, AsyncSessionLocal
+    from server.main import app
+    from server.models.base import Base
+    from server.services.llm_scheduler import llm_scheduler
+    from bench.fake_ollama import app_from_args, serve
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    token = await _bench_token(AsyncSessionLocal)
+    llm_scheduler.max_concurrency = args.streams
+
+    fake, fake_task = await serve(app_from_args(args), args.ollama_port)
+    api, api_task = await serve(app, args.port)
+
+    halfway = asyncio.Event()
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=None,
+    ) as client:
+        events = [asyncio.Event() for _ in range(args.streams)]
+        tasks = [
+            asyncio.create_task(_open_stream(client, args.tokens, e, halfway)) for e in events
+        ]
+        await asyncio.gather(*(e.wait() for e in events))
+
+        samples = []
+        while not halfway.is_set():
+            samples.append(engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+
+    for server in (api, fake):
+        server.should_exit = True
+    await asyncio.gather(api_task, fake_task)
+    await engine.dispose()
+
+    peak = max(samples, default=0)
+    print(
+        f"{args.streams} streams open, {len(samples)} samples: "
+        f"pool checked out peak {peak}, pool size {engine.pool.size()}"
+    )
+    return peak == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL from the environment/.env")
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--ollama-port", type=int, default=18001)
+    add_arguments(parser)
+    parser.set_defaults(tokens=100)
+    args = parser.parse_args()
+
+    from server.config import settings
+
+    if args.database_url:
+        settings.DATABASE_URL = args.database_url
+    settings.OLLAMA_BASE_URL = f"http://127.0.0.1:{args.ollama_port}"
+    sys.exit(0 if asyncio.run(main(args)) else 1)
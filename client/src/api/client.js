@@ -11,6 +11,13 @@ export function getAuthHeaders() {
   return token ? { Authorization: `Bearer ${token}` } : {};
 }
 
+/**
+ * Replaces the stored Bearer token, e.g. with the one returned after a password change.
+ */
+export function setAuthToken(token) {
+  localStorage.setItem(TOKEN_KEY, token);
+}
+
 function clearAuthAndRedirect() {
   localStorage.removeItem(TOKEN_KEY);
   localStorage.removeItem(SESSION_KEY);
@@ -214,7 +221,19 @@ export const chatApi = {
       method: 'POST',
       body: JSON.stringify({ message, sessionId }),
     }),
-  getHistory: (sessionId) => request(`/chat/history?sessionId=${sessionId}`),
-  getSessions: () => request('/chat/sessions'),
+  getHistory: (sessionId, { before, after, limit } = {}) => {
+    const params = new URLSearchParams({ sessionId });
+    if (before) params.set('before', before);
+    if (after) params.set('after', after);
+    if (limit) params.set('limit', limit);
+    return request(`/chat/history?${params}`);
+  },
+  getSessions: ({ before, limit } = {}) => {
+    const params = new URLSearchParams();
+    if (before) params.set('before', before);
+    if (limit) params.set('limit', limit);
+    return request(`/chat/sessions?${params}`);
+  },
   createSession: () => request('/chat/sessions', { method: 'POST' }),
+  prewarm: () => request('/chat/prewarm', { method: 'POST' }),
 };
@@ -1,12 +1,13 @@
 import { useState, useRef, useEffect, useCallback } from 'react';
 import { MessageCircle, X, Send, Bot, User, Loader2, AlertCircle } from 'lucide-react';
-import { getAuthHeaders } from '../api/client';
+import { getAuthHeaders, chatApi } from '../api/client';
 export default function ChatPanel({ toggleRef }) {
   const [open, setOpen] = useState(false);
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [sessionId, setSessionId] = useState(null);
+  const [queuePosition, setQueuePosition] = useState(0);
   const bottomRef = useRef(null);
   const abortRef = useRef(null);
 
@@ -14,6 +15,11 @@ export default function ChatPanel({ toggleRef }) {
     if (toggleRef) toggleRef.current = () => setOpen((o) => !o);
   }, [toggleRef]);
 
+  // Warm the user's context and the model while they type the first message
+  useEffect(() => {
+    if (open) chatApi.prewarm().catch(() => {});
+  }, [open]);
+
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
@@ -66,6 +72,15 @@ export default function ChatPanel({ toggleRef }) {
         signal: controller.signal,
       });
 
+      if (res.status === 429) {
+        const retryAfter = res.headers.get('Retry-After');
+        setLastAssistantContent(
+          `Error: The assistant is busy right now. Please try again${retryAfter ? ` in ${retryAfter} seconds` : ' shortly'}.`
+        );
+        setLoading(false);
+        return;
+      }
+
       if (!res.ok) {
         const errText = await res.text().catch(() => res.statusText);
         setLastAssistantContent(`Error: ${errText}`);
@@ -102,7 +117,12 @@ export default function ChatPanel({ toggleRef }) {
               setSessionId(data.sessionId);
             }
 
+            if (data.queuePosition !== undefined) {
+              setQueuePosition(data.queuePosition);
+            }
+
             if (data.token) {
+              setQueuePosition(0);
               appendToLastAssistant(data.token);
             }
 
@@ -151,6 +171,7 @@ export default function ChatPanel({ toggleRef }) {
       );
     } finally {
       setLoading(false);
+      setQueuePosition(0);
       abortRef.current = null;
     }
   }, [sessionId, appendToLastAssistant, setLastAssistantContent]);
@@ -253,6 +274,11 @@ export default function ChatPanel({ toggleRef }) {
                   }`}
                 >
                   {m.content}
+                  {isLastAssistant && !m.content && queuePosition > 0 && (
+                    <span className="text-xs text-gray-400">
+                      Waiting for the assistant — you are #{queuePosition} in line…
+                    </span>
+                  )}
                   {isLastAssistant && (
                     <span className="inline-block w-1.5 h-4 bg-primary/60 ml-0.5 animate-pulse rounded-sm align-text-bottom" />
                   )}
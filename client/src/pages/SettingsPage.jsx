@@ -6,7 +6,7 @@ import {
   Calendar, Clock, Phone, Check, AlertTriangle, ChevronDown, Moon, Sun,
   Eye, EyeOff,
 } from 'lucide-react';
-import { notificationsApi, usersApi } from '../api/client';
+import { notificationsApi, usersApi, setAuthToken } from '../api/client';
 import { useDarkMode } from '../hooks/useDarkMode';
 import { useAuth } from '../hooks/useAuth';
 
@@ -542,7 +542,9 @@ function AccountSection({ showToast }) {
 
   const changePwMut = useMutation({
     mutationFn: (data) => usersApi.changePassword(data),
-    onSuccess: () => {
+    onSuccess: (data) => {
+      // The old token stops working once the password changes
+      if (data?.token) setAuthToken(data.token);
       setPw({ current: '', newPw: '', confirm: '' });
       setPwErrors({});
       showToast('Password changed');
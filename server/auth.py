@@ -1,3 +1,6 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -12,17 +15,79 @@ from server.database import get_db
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+# bcrypt takes tens of milliseconds per call and releases the GIL, so it runs on
+# a small dedicated pool instead of blocking the event loop (and every open
+# SSE stream with it). Calls beyond BCRYPT_MAX_THREADS wait in the pool's queue.
+_bcrypt_pool: ThreadPoolExecutor | None = None
+_bcrypt_stats = {"calls": 0, "inFlight": 0, "queueMsTotal": 0.0, "queueMsMax": 0.0, "runMsTotal": 0.0}
 
 
-def verify_password(plain: str, hashed: str) -> bool:
+def _timed(fn, *args):
+    started = time.perf_counter()
+    return fn(*args), started, time.perf_counter()
+
+
+async def _run_bcrypt(fn, *args):
+    global _bcrypt_pool
+    if _bcrypt_pool is None:
+        _bcrypt_pool = ThreadPoolExecutor(settings.BCRYPT_MAX_THREADS, thread_name_prefix="bcrypt")
+    submitted = time.perf_counter()
+    _bcrypt_stats["inFlight"] += 1
+    try:
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(
+            _bcrypt_pool, _timed, fn, *args
+        )
+    finally:
+        _bcrypt_stats["inFlight"] -= 1
+    queue_ms = (started - submitted) * 1000
+    _bcrypt_stats["calls"] += 1
+    _bcrypt_stats["queueMsTotal"] += queue_ms
+    _bcrypt_stats["queueMsMax"] = max(_bcrypt_stats["queueMsMax"], queue_ms)
+    _bcrypt_stats["runMsTotal"] += (finished - started) * 1000
+    return result
+
+
+def bcrypt_stats() -> dict:
+    calls = _bcrypt_stats["calls"]
+    return {
+        "calls": calls,
+        "inFlight": _bcrypt_stats["inFlight"],
+        "queued": max(0, _bcrypt_stats["inFlight"] - settings.BCRYPT_MAX_THREADS),
+        "maxThreads": settings.BCRYPT_MAX_THREADS,
+        "rounds": settings.BCRYPT_ROUNDS,
+        "queueMsAvg": round(_bcrypt_stats["queueMsTotal"] / calls, 2) if calls else 0.0,
+        "queueMsMax": round(_bcrypt_stats["queueMsMax"], 2),
+        "runMsAvg": round(_bcrypt_stats["runMsTotal"] / calls, 2) if calls else 0.0,
+    }
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode()
+
+
+def _check(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode(), hashed.encode())
 
 
-def create_access_token(user_id: int) -> str:
+async def hash_password(password: str) -> str:
+    return await _run_bcrypt(_hash, password)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _run_bcrypt(_check, plain, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def create_access_token(user_id: int, token_version: int) -> str:
     expire = datetime.now(timezone.utc) + timedelta(hours=settings.JWT_EXPIRATION_HOURS)
-    payload = {"sub": str(user_id), "exp": expire}
+    payload = {"sub": str(user_id), "ver": token_version, "exp": expire}
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
@@ -52,6 +117,7 @@ async def get_current_user(
     db: AsyncSession = Depends(get_db),
 ):
     from server.models.user import User
+    from server.services import user_cache
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,8 +130,18 @@ async def get_current_user(
     except (JWTError, TypeError, ValueError):
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = user_cache.get_user(db, user_id)
     if user is None:
+        generation = user_cache.generation()
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise credentials_exception
+        user_cache.store_user(user, generation)
+
+    # Tokens issued before a password change or reset are revoked, on other
+    # workers once their cached user expires (USER_CACHE_TTL_SECONDS). Tokens
+    # from before versions were added count as version 0.
+    if payload.get("ver", 0) != user.token_version:
         raise credentials_exception
     return user
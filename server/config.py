@@ -6,11 +6,78 @@ load_dotenv()
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "postgresql://localhost/productivity_hub"
+    DATABASE_REPLICA_URL: str = ""  # read-only handlers use this when set
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # reads stay on the primary this long after a write
+    # Per worker process: size the pool so workers x (size + overflow) fits max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1  # seconds; -1 keeps connections indefinitely
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
+    DB_PGBOUNCER: bool = False  # transaction-mode PgBouncer: no prepared statement caching
+    SQL_STATS_ENABLED: bool = True  # per-request query counts, Server-Timing and N+1 warnings
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5  # identical statements per request before warning
     JWT_SECRET_KEY: str = "change-me"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 72
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_MAX_THREADS: int = 2
+    # Also how long another worker may still accept a token revoked by a password
+    # change or reset (the worker that made the change drops it at once).
+    # 0 disables the get_current_user cache.
+    USER_CACHE_TTL_SECONDS: float = 5.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2"
+    # JSON list of {"url", "model", "weight"}; overrides OLLAMA_BASE_URL when set
+    OLLAMA_BACKENDS: str = ""
+    OLLAMA_HEALTH_INTERVAL_SECONDS: float = 10.0
+    OLLAMA_EJECT_SECONDS: float = 30.0
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_READ_TIMEOUT: float = 120.0
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY: float = 60.0
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    OLLAMA_NUM_CTX: int | None = None
+    OLLAMA_NUM_PREDICT: int | None = None
+    OLLAMA_WARM_ON_STARTUP: bool = True
+    OLLAMA_MAX_TOOL_ROUNDS: int = 3
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_MAX_QUEUE_DEPTH: int = 32
+    LLM_MAX_QUEUED_PER_USER: int = 3
+    SSE_FLUSH_INTERVAL_MS: int = 50
+    SSE_FLUSH_MAX_CHARS: int = 256
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    CHAT_MODE: str = "context"  # "context" (build_context prompt) or "tools"
+    INTENT_ROUTER_ENABLED: bool = True
+    INTENT_MIN_CONFIDENCE: float = 0.9
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: int = 600
+    RESPONSE_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    RESPONSE_CACHE_REPLAY_WORDS_PER_SECOND: float = 150.0
+    CHAT_PREWARM_TTL_SECONDS: int = 60
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2048
+    CHAT_HISTORY_MAX_MESSAGES: int = 100
+    CHAT_SUMMARY_BATCH_MESSAGES: int = 40
+    CHAT_RECENT_CACHE_SESSIONS: int = 500
+    CONTEXT_CACHE_TTL_SECONDS: int = 300
+    CONTEXT_CACHE_MAX_USERS: int = 1000
+    CONTEXT_QUERY_CONCURRENCY: int = 4
+    CHAT_MEMORY_IDLE_MINUTES: int = 30
+    CHAT_MEMORY_JOB_MINUTES: int = 5
+    CHAT_MEMORY_BATCH_SESSIONS: int = 20
+    CHAT_MEMORY_MAX_MESSAGES: int = 60
+    CHAT_MEMORY_TOP_K: int = 3
+    CHAT_MEMORY_MAX_PER_USER: int = 500  # oldest memories beyond this are dropped
+    CHAT_MEMORY_MIN_SCORE: float = 0.15
+    EMBEDDING_INDEX_DIR: str = "data/embeddings"
+    EMBEDDING_DIM: int = 1024
+    RAG_TOP_K: int = 4
+    RAG_MIN_SCORE: float = 0.1
+    RAG_PASSAGE_CHARS: int = 400
+    INTERNAL_API_TOKEN: str = ""
     NOVU_API_KEY: str = ""
     FRONTEND_URL: str = "http://localhost:5173"
 
@@ -18,6 +85,10 @@ class Settings(BaseSettings):
     def async_database_url(self) -> str:
         return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
+    @property
+    def async_replica_url(self) -> str:
+        return self.DATABASE_REPLICA_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,95 @@
+import time
+from uuid import uuid4
+
+from fastapi import Request
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from server.config import settings
 
-engine = create_async_engine(settings.async_database_url, echo=False)
+# Cookie set on successful writes (see ReadYourWritesMiddleware); while it
+# lasts, get_read_db stays on the primary so the client sees its own changes.
+RECENT_WRITE_COOKIE = "recent_write"
+
+# Checkout counters for this worker process per pool name, reported by pool_stats()
+_checkouts: dict[str, dict] = {}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait and how many time out."""
+
+    def _do_get(self):
+        stats = _checkouts.setdefault(
+            self._orig_logging_name, {"count": 0, "waitMsTotal": 0.0, "waitMsMax": 0.0, "timeouts": 0}
+        )
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        finally:
+            wait_ms = (time.perf_counter() - start) * 1000
+            stats["count"] += 1
+            stats["waitMsTotal"] += wait_ms
+            stats["waitMsMax"] = max(stats["waitMsMax"], wait_ms)
+
+
+def _engine_kwargs(url: str, name: str) -> dict:
+    kwargs = {
+        "poolclass": InstrumentedPool,
+        "pool_logging_name": name,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        if settings.DB_PGBOUNCER:
+            # PgBouncer in transaction mode hands each transaction to any server
+            # connection, so prepared statements can't be cached or reuse names.
+            kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            kwargs["connect_args"] = {
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            }
+    return kwargs
+
+
+def _create_engine(url: str, name: str):
+    return create_async_engine(url, echo=False, **_engine_kwargs(url, name))
+
+
+engine = _create_engine(settings.async_database_url, "primary")
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Without a replica, reads share the primary engine
+read_engine = _create_engine(settings.async_replica_url, "replica") if settings.DATABASE_REPLICA_URL else engine
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def pool_stats(db_engine=None) -> dict:
+    pool = (db_engine or engine).sync_engine.pool
+    stats = _checkouts.get(pool._orig_logging_name, {})
+    count = stats.get("count", 0)
+    return {
+        "size": pool.size(),
+        "checkedOut": pool.checkedout(),
+        "checkedIn": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "maxOverflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": count,
+        "waitMsAvg": round(stats["waitMsTotal"] / count, 2) if count else 0.0,
+        "waitMsMax": round(stats.get("waitMsMax", 0.0), 2),
+        "timeouts": stats.get("timeouts", 0),
+        "pgbouncer": settings.DB_PGBOUNCER,
+    }
+
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -13,3 +99,15 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
+
+
+async def get_read_db(request: Request):
+    """Session for read-only handlers: the replica, unless this client wrote recently.
+
+    Nothing is committed; handlers using it must not write.
+    """
+    session_factory = ReadSessionLocal
+    if request.cookies.get(RECENT_WRITE_COOKIE):
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        yield session
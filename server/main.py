@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
@@ -9,6 +10,9 @@ from server.database import engine
 from server.models.base import Base
 import server.models  # noqa: F401 — register all models
 from server.services.scheduler import start_scheduler, stop_scheduler
+from server.config import settings
+from server.middleware import ReadYourWritesMiddleware, QueryStatsMiddleware
+from server.services.ollama_service import start_ollama_client, close_ollama_client, warm_ollama_model
 
 from server.routes.auth import router as auth_router
 from server.routes.calendar import router as calendar_router
@@ -26,6 +30,7 @@ from server.routes.activity import router as activity_router
 from server.routes.tags import router as tags_router
 from server.routes.notifications import router as notifications_router
 from server.routes.users import router as users_router
+from server.routes.internal import router as internal_router
 
 
 @asynccontextmanager
@@ -34,11 +39,19 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     start_scheduler()
+    start_ollama_client()
+    # Load the model in the background so startup isn't blocked on Ollama
+    warmup = asyncio.create_task(warm_ollama_model()) if settings.OLLAMA_WARM_ON_STARTUP else None
     yield
+    if warmup:
+        warmup.cancel()
+    await close_ollama_client()
     stop_scheduler()
 
 
 app = FastAPI(title="Quorex", lifespan=lifespan)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 
 # --- API routers (all prefixed under /api) ---
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
@@ -57,6 +70,7 @@ app.include_router(activity_router, prefix="/api", tags=["activity"])
 app.include_router(tags_router, prefix="/api", tags=["tags"])
 app.include_router(notifications_router, prefix="/api", tags=["notifications"])
 app.include_router(users_router, prefix="/api", tags=["users"])
+app.include_router(internal_router, prefix="/api/internal", tags=["internal"])
 
 # --- SPA serving (production: Vite build output) ---
 DIST_DIR = os.path.join(os.path.dirname(__file__), "..", "client", "dist")
@@ -0,0 +1,75 @@
+"""
+ASGI middleware. Written as plain ASGI callables rather than BaseHTTPMiddleware
+so streamed (SSE) responses pass through untouched.
+"""
+
+import math
+
+from starlette.datastructures import MutableHeaders
+
+from server.config import settings
+from server.database import RECENT_WRITE_COOKIE
+from server.query_stats import collect_queries, log_queries
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadYourWritesMiddleware:
+    """Mark clients that just wrote so get_read_db keeps them on the primary.
+
+    Any successful non-GET request under /api sets a short-lived cookie, which
+    every worker honours, for READ_YOUR_WRITES_SECONDS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or not scope["path"].startswith("/api/")
+            or not settings.DATABASE_REPLICA_URL
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f"{RECENT_WRITE_COOKIE}=1; Max-Age={math.ceil(settings.READ_YOUR_WRITES_SECONDS)}; "
+            "Path=/api; HttpOnly; SameSite=Lax"
+        )
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+class QueryStatsMiddleware:
+    """Count each request's SQL statements and database time.
+
+    The totals so far go out in a Server-Timing header when the response
+    starts; the full totals, including statements run while streaming, are
+    logged when it ends (see query_stats).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries() as stats:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("server-timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                log_queries(f"{scope['method']} {scope['path']}", stats)
@@ -5,7 +5,7 @@ from server.models.note import Note
 from server.models.goal import Goal, Milestone, SubMilestone
 from server.models.journal import JournalEntry
 from server.models.habit import HabitLog, CustomHabit, CustomHabitLog
-from server.models.chat_message import ChatMessage
+from server.models.chat_message import ChatMessage, ChatSession, ChatSessionSummary, ChatMemory
 from server.models.tag import CustomTag
 from server.models.thought import Community, ThoughtPost, Comment, Vote
 from server.models.focus import FocusSession
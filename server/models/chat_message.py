@@ -1,11 +1,15 @@
 from datetime import datetime, timezone
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column
 from server.models.base import Base
 
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Serves history pages and the prompt window, newest first
+        Index("ix_chat_messages_user_session_created", "user_id", "session_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
@@ -15,6 +19,9 @@ class ChatMessage(Base):
     content: Mapped[str] = mapped_column(Text, nullable=False)
     mode: Mapped[str] = mapped_column(String(20), default="ollama")
     session_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    token_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Set when the client disconnected before the reply finished streaming
+    truncated: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -26,5 +33,92 @@ class ChatMessage(Base):
             "content": self.content,
             "mode": self.mode,
             "sessionId": self.session_id,
+            "truncated": bool(self.truncated),
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class ChatSessionSummary(Base):
+    """Rolling summary of the turns that no longer fit in a session's history window."""
+
+    __tablename__ = "chat_session_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "session_id", name="uq_chat_summary_user_session"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    session_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    summary: Mapped[str] = mapped_column(Text, default="")
+    summarized_through_id: Mapped[int] = mapped_column(Integer, default=0)
+    token_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+
+class ChatSession(Base):
+    """One row per chat session, kept current as messages are saved.
+
+    Lets /chat/sessions list sessions without aggregating every message.
+    """
+
+    __tablename__ = "chat_sessions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "session_id", name="uq_chat_session_user_session"),
+        Index("ix_chat_sessions_user_last_message", "user_id", "last_message_at", "id"),
+        # Sessions with messages not yet turned into memories, oldest activity first
+        Index(
+            "ix_chat_sessions_memory_pending", "last_message_at",
+            postgresql_where=text("memorized_at IS NULL OR memorized_at < last_message_at"),
+            sqlite_where=text("memorized_at IS NULL OR memorized_at < last_message_at"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    title: Mapped[str | None] = mapped_column(String(80), nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_message_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    message_count: Mapped[int] = mapped_column(Integer, default=0)
+    # last_message_at as of the last time the session was turned into memories
+    memorized_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        return {
+            "sessionId": self.session_id,
+            "title": self.title,
+            "started": self.started_at.isoformat(),
+            "lastMessage": self.last_message_at.isoformat(),
+            "messageCount": self.message_count,
+        }
+
+
+class ChatMemory(Base):
+    """A fact distilled from a finished chat session, retrieved into later chats."""
+
+    __tablename__ = "chat_memories"
+    __table_args__ = (
+        Index("ix_chat_memories_user_session", "user_id", "session_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "sessionId": self.session_id,
+            "content": self.content,
             "createdAt": self.created_at.isoformat() if self.created_at else None,
         }
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Integer, String, DateTime
+from sqlalchemy import Integer, String, DateTime, text
 from sqlalchemy.orm import Mapped, mapped_column
 from server.models.base import Base
 
@@ -12,6 +12,8 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(300), unique=True, nullable=False, index=True)
     password_hash: Mapped[str] = mapped_column(String(300), nullable=False)
     timezone: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # Carried in access tokens; bumped when the password is changed or reset to revoke them
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     def to_dict(self):
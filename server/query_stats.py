@@ -0,0 +1,140 @@
+"""
+Per-request SQL statistics and N+1 detection.
+
+Engine cursor events add each statement's duration to the QueryStats being
+collected for the current request or scheduler job. The stats are found
+through a context variable, which asyncio tasks and SQLAlchemy's greenlets
+inherit. A statement shape (its SQL with placeholders for the parameters) run
+SQL_N_PLUS_ONE_THRESHOLD or more times in one unit of work is logged as a
+likely N+1.
+
+- QueryStatsMiddleware (server.middleware) reports requests in a Server-Timing
+  header and a log line.
+- instrumented() does the same for scheduler jobs.
+- query_budget() fails a block that runs too many statements, for tests.
+"""
+
+import functools
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from server.config import settings
+
+logger = logging.getLogger(__name__)
+
+SHAPE_LOG_CHARS = 200
+
+
+class QueryStats:
+    """Statement count, database time and statement shapes for one unit of work."""
+
+    def __init__(self, parent: "QueryStats | None" = None):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Statement shapes run often enough to look like an N+1, most frequent first."""
+        return [
+            (shape, n) for shape, n in self.shapes.most_common()
+            if n >= settings.SQL_N_PLUS_ONE_THRESHOLD
+        ]
+
+    def server_timing(self) -> str:
+        noun = "query" if self.count == 1 else "queries"
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} {noun}"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def collect_queries():
+    """Collect statements run in this block, also counting them in any enclosing block."""
+    stats = QueryStats(_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    while stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.shapes[statement] += 1
+        stats = stats.parent
+
+
+def log_queries(label: str, stats: QueryStats):
+    """Log a unit of work's totals, and a warning for each likely N+1."""
+    fields = {"db_label": label, "db_queries": stats.count, "db_ms": round(stats.seconds * 1000, 1)}
+    for shape, n in stats.repeated():
+        logger.warning(
+            "Possible N+1 in %s: %d x %s", label, n, " ".join(shape.split())[:SHAPE_LOG_CHARS],
+            extra={**fields, "db_repeats": n},
+        )
+    logger.debug("%s: %d queries, %.1f ms in the database", label, stats.count, fields["db_ms"], extra=fields)
+
+
+def instrumented(job):
+    """Wrap a coroutine function (a scheduler job) to log its query stats."""
+
+    @functools.wraps(job)
+    async def run(*args, **kwargs):
+        if not settings.SQL_STATS_ENABLED:
+            return await job(*args, **kwargs)
+        with collect_queries() as stats:
+            try:
+                return await job(*args, **kwargs)
+            finally:
+                log_queries(job.__name__, stats)
+
+    return run
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int | None = None):
+    """Fail if the block runs more than max_queries statements, or any one
+    statement shape more than max_repeats times.
+
+    Meant for a pytest fixture around requests made in the same task, e.g. with
+    httpx.AsyncClient(transport=httpx.ASGITransport(app=app)):
+
+        with query_budget(6, max_repeats=1):
+            await client.get("/api/habits/week")
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(f"{stats.count} queries, budget {max_queries}")
+    if max_repeats is not None:
+        shape, n = (stats.shapes.most_common(1) or [("", 0)])[0]
+        if n > max_repeats:
+            raise QueryBudgetExceeded(
+                f"{n} x {' '.join(shape.split())[:SHAPE_LOG_CHARS]} (max {max_repeats})"
+            )
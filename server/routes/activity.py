@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.database import get_db
+from server.database import get_read_db
 from server.auth import get_current_user
 from server.models.note import Note
 from server.models.goal import Goal
@@ -33,7 +33,7 @@ def _week_bounds():
 
 @router.get("/activity-feed")
 async def get_activity_feed(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     monday, sunday = _week_bounds()
@@ -161,17 +161,19 @@ async def get_activity_feed(
         )
     )
     custom_logs = result.scalars().all()
-    habit_cache = {}
+    habit_ids = {cl.custom_habit_id for cl in custom_logs}
+    habit_names = {}
+    if habit_ids:
+        habit_result = await db.execute(
+            select(CustomHabit.id, CustomHabit.name).where(
+                CustomHabit.user_id == user.id, CustomHabit.id.in_(habit_ids)
+            )
+        )
+        habit_names = dict(habit_result.all())
     for cl in custom_logs:
         if not cl.value or cl.value == "false":
             continue
-        if cl.custom_habit_id not in habit_cache:
-            habit_result = await db.execute(
-                select(CustomHabit).where(CustomHabit.id == cl.custom_habit_id)
-            )
-            habit = habit_result.scalar_one_or_none()
-            habit_cache[cl.custom_habit_id] = habit.name if habit else "Custom habit"
-        name = habit_cache[cl.custom_habit_id]
+        name = habit_names.get(cl.custom_habit_id, "Custom habit")
         items.append({
             "type": "habit",
             "action": "logged",
@@ -6,8 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from server.config import settings
 from server.database import get_db
-from server.auth import hash_password, verify_password, create_access_token, create_reset_token, verify_reset_token
+from server.auth import hash_password, verify_password, needs_rehash, create_access_token, create_reset_token, verify_reset_token
 from server.models.user import User
+from server.services.user_cache import invalidate_user
 from server.services.novu_service import trigger_password_reset
 
 logger = logging.getLogger(__name__)
@@ -46,13 +47,13 @@ async def register(body: RegisterBody, db: AsyncSession = Depends(get_db)):
     user = User(
         name=body.name,
         email=body.email,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password(body.password),
     )
     db.add(user)
     await db.flush()
     await db.refresh(user)
 
-    token = create_access_token(user.id)
+    token = create_access_token(user.id, user.token_version)
     return {"token": token, "user": user.to_dict()}
 
 
@@ -61,10 +62,17 @@ async def login(body: LoginBody, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.password_hash):
+    if not user or not await verify_password(body.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    token = create_access_token(user.id)
+    if needs_rehash(user.password_hash):
+        # BCRYPT_ROUNDS changed since this hash was made. The password is the
+        # same, so token_version stays and the user's other tokens keep working.
+        user.password_hash = await hash_password(body.password)
+        await db.flush()
+        invalidate_user(db, user.id)
+
+    token = create_access_token(user.id, user.token_version)
     return {"token": token, "user": user.to_dict()}
 
 
@@ -96,6 +104,8 @@ async def reset_password(body: ResetPasswordBody, db: AsyncSession = Depends(get
     if not user or user.password_hash[:10] != claims["fingerprint"]:
         raise HTTPException(status_code=400, detail="Invalid or expired reset link.")
 
-    user.password_hash = hash_password(body.password)
+    user.password_hash = await hash_password(body.password)
+    user.token_version += 1
     await db.flush()
+    invalidate_user(db, user.id)
     return {"message": "Password reset successfully."}
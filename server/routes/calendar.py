@@ -7,10 +7,11 @@ from fastapi.responses import JSONResponse
 from sqlalchemy import select, func, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.database import get_db
+from server.database import get_db, get_read_db
 from server.auth import get_current_user
 from server.models.calendar_event import CalendarEvent
 from server.services.recurrence import expand_recurring_events
+from server.services.context_cache import invalidate_context
 
 router = APIRouter(prefix="")
 
@@ -45,7 +46,7 @@ class EventUpdate(BaseModel):
 async def get_events(
     start: Optional[str] = None,
     end: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     range_start = datetime.fromisoformat(start) if start else None
@@ -113,6 +114,7 @@ async def create_event(
         reminder_minutes=body.reminderMinutes,
     )
     db.add(event)
+    invalidate_context(db, user.id, "events")
     await db.flush()
     await db.refresh(event)
     return JSONResponse(content=event.to_dict(), status_code=201)
@@ -120,7 +122,7 @@ async def create_event(
 
 @router.get("/calendar/categories")
 async def get_categories(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     result = await db.execute(
@@ -139,7 +141,7 @@ async def get_categories(
 @router.get("/calendar/{id}")
 async def get_event(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     result = await db.execute(
@@ -190,6 +192,7 @@ async def update_event(
     if body.reminderMinutes is not None:
         event.reminder_minutes = body.reminderMinutes if body.reminderMinutes > 0 else None
 
+    invalidate_context(db, user.id, "events")
     await db.flush()
     await db.refresh(event)
     return event.to_dict()
@@ -211,5 +214,6 @@ async def delete_event(
         raise HTTPException(status_code=404, detail="Event not found")
 
     await db.delete(event)
+    invalidate_context(db, user.id, "events")
     await db.flush()
     return {"message": "Event deleted"}
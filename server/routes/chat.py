@@ -1,29 +1,172 @@
-import json
+import asyncio
+import logging
 import uuid
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Literal
 
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select, func
+from starlette.background import BackgroundTask
+from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.database import get_db
+from server.config import settings
+from server.database import get_db, get_read_db, AsyncSessionLocal
 from server.auth import get_current_user
-from server.models.chat_message import ChatMessage
-from server.services.ollama_service import get_ollama_response, stream_ollama_response
+from server.models.chat_message import ChatMessage, ChatSession
+from server.services.ollama_service import ErrorMessage, get_ollama_response, stream_ollama_response
 from server.services.context_builder import build_context
+from server.services.chat_history import save_chat_message, load_history
+from server.services.llm_scheduler import llm_scheduler, QueueFullError
+from server.services.sse import sse_event, coalesced_frames
+from server.services.embedding_index import relevant_passages, relevant_memories, with_passages
+from server.services.chat_tools import TOOLS, run_tool, tools_prompt, user_tz
+from server.services.intent_router import answer_intent
+from server.services import response_cache
+from server.services.chat_prewarm import prewarm
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="")
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Strong refs to in-flight reply tasks (the event loop only keeps weak ones)
+_reply_tasks: set[asyncio.Task] = set()
+
+
+def _reserve_generation(user_id: int):
+    """Queue for an LLM slot, or answer 429 when the queue is full."""
+    try:
+        return llm_scheduler.submit(user_id)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="The assistant is busy right now. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def _answer_directly(db, user, session_id: str, message: str) -> str | None:
+    """Save and return a templated reply if message is a plain data lookup."""
+    answer = await answer_intent(db, user.id, user_tz(user.timezone), message)
+    if answer is not None:
+        await save_chat_message(db, user.id, session_id, "user", message)
+        await save_chat_message(db, user.id, session_id, "assistant", answer, mode="intent")
+        await db.commit()
+    return answer
+
+
+async def _prepare_prompt(db, user, body, messages):
+    """Return (messages, system prompt, tool kwargs) for the requested chat mode.
+
+    "context" sends the build_context summary plus retrieved passages with every
+    message; "tools" sends a short prompt and lets the model fetch what it needs.
+    Both get the most relevant memories from earlier sessions.
+    """
+    memories = await relevant_memories(user.id, body.message)
+    if (body.mode or settings.CHAT_MODE) == "tools":
+        tz = user_tz(user.timezone)
+        messages = with_passages(messages, [], memories)
+        return messages, tools_prompt(tz), {"tools": TOOLS, "run_tool": partial(run_tool, user.id, tz)}
+
+    passages = await relevant_passages(user.id, body.message)
+    messages = with_passages(messages, passages, memories)
+    return messages, await build_context(db, user.id), {}
+
+
+def _response_cache_key(messages, context, tools):
+    # Tool results are fetched mid-generation, so those replies aren't reusable
+    return None if tools else response_cache.cache_key(messages, context)
+
+
+async def _stream_reply(
+    ticket, user_id, session_id, messages, context, tools, cache_key, events: asyncio.Queue
+):
+    """Stream one reply from Ollama into events, ending with None.
+
+    Runs as its own task so a disconnect can cancel it: cancelling closes the
+    upstream httpx stream, which makes Ollama stop generating. Whatever text
+    arrived is saved either way, flagged truncated if the stream was cut short.
+    Only complete, error-free replies go into the response cache.
+    """
+    full_response = []
+    truncated = False
+    failed = False
+    try:
+        async for position in ticket.positions():
+            events.put_nowait({"queuePosition": position})
+
+        async for token in stream_ollama_response(messages, context, **tools):
+            failed = failed or isinstance(token, ErrorMessage)
+            full_response.append(token)
+            events.put_nowait({"token": token})
+    except asyncio.CancelledError:
+        truncated = True
+    except Exception as e:
+        failed = True
+        events.put_nowait({"token": f"Error: {str(e)}"})
+    finally:
+        ticket.release()
+
+    complete_text = "".join(full_response)
+    if not (truncated or failed):
+        response_cache.put(cache_key, complete_text)
+    if complete_text:
+        async with AsyncSessionLocal() as save_db:
+            try:
+                await save_chat_message(
+                    save_db, user_id, session_id, "assistant", complete_text, truncated=truncated
+                )
+                await save_db.commit()
+            except Exception:
+                await save_db.rollback()
+                logger.exception("Failed to save assistant reply for session %s", session_id)
+
+    events.put_nowait(None)
+
+
+async def _replay_reply(reply: str, events: asyncio.Queue):
+    """Feed a cached reply into events at the configured replay speed."""
+    try:
+        async for chunk in response_cache.replay(reply):
+            events.put_nowait({"token": chunk})
+    finally:
+        events.put_nowait(None)
+
+
+async def _answer_events(session_id: str, answer: str):
+    yield sse_event({"sessionId": session_id})
+    yield sse_event({"token": answer})
+    yield sse_event({"done": True})
+
+
+async def _release_ticket(ticket):
+    # Async so Starlette runs it on the event loop rather than in a worker thread
+    ticket.release()
+
+
+async def _cancel_on_disconnect(request: Request, reply: asyncio.Task):
+    # The request body has been read, so the next message is the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            reply.cancel()
+            return
+
 
 class ChatBody(BaseModel):
     message: str
     sessionId: str | None = None
+    mode: Literal["context", "tools"] | None = None
 
 
 class StreamBody(BaseModel):
     message: str
     sessionId: str | None = None
+    mode: Literal["context", "tools"] | None = None
 
 
 @router.post("/chat")
@@ -33,41 +176,38 @@ async def chat(
     user=Depends(get_current_user),
 ):
     session_id = body.sessionId or str(uuid.uuid4())
-
-    # Save user message
-    user_msg = ChatMessage(
-        user_id=user.id,
-        role="user",
-        content=body.message,
-        mode="ollama",
-        session_id=session_id,
-    )
-    db.add(user_msg)
-    await db.flush()
-
-    # Get conversation history
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.user_id == user.id, ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(20)
-    )
-    history = list(result.scalars().all())
-    history.reverse()
-
-    messages = [{"role": m.role, "content": m.content} for m in history]
-    context = await build_context(db, user.id)
-    response = await get_ollama_response(messages, context)
+    answer = await _answer_directly(db, user, session_id, body.message)
+    if answer is not None:
+        return {"answer": answer, "sessionId": session_id}
+    ticket = _reserve_generation(user.id)
+
+    try:
+        # Save user message
+        await save_chat_message(db, user.id, session_id, "user", body.message)
+        await db.flush()
+
+        # Get conversation history (newest turns within the token budget)
+        messages = await load_history(db, user.id, session_id)
+        await db.commit()
+        messages, context, tools = await _prepare_prompt(db, user, body, messages)
+        # Don't hold a connection while queued for the model or generating
+        await db.commit()
+
+        cache_key = _response_cache_key(messages, context, tools)
+        response = response_cache.get(cache_key)
+        if response is None:
+            await ticket.wait()
+            response = await get_ollama_response(messages, context, **tools)
+            if not isinstance(response, ErrorMessage):
+                response_cache.put(cache_key, response)
+            mode = "ollama"
+        else:
+            mode = "cache"
+    finally:
+        ticket.release()
 
     # Save assistant message
-    assistant_msg = ChatMessage(
-        user_id=user.id,
-        role="assistant",
-        content=response,
-        mode="ollama",
-        session_id=session_id,
-    )
-    db.add(assistant_msg)
+    await save_chat_message(db, user.id, session_id, "assistant", response, mode=mode)
     await db.flush()
 
     return {
@@ -79,69 +219,73 @@ async def chat(
 @router.post("/chat/stream")
 async def chat_stream(
     body: StreamBody,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
     session_id = body.sessionId or str(uuid.uuid4())
-
-    # Save user message
-    user_msg = ChatMessage(
-        user_id=user.id,
-        role="user",
-        content=body.message,
-        mode="ollama",
-        session_id=session_id,
-    )
-    db.add(user_msg)
-    await db.flush()
-
-    # Get conversation history
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.user_id == user.id, ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(20)
-    )
-    history = list(result.scalars().all())
-    history.reverse()
-
-    messages = [{"role": m.role, "content": m.content} for m in history]
-    context = await build_context(db, user.id)
+    answer = await _answer_directly(db, user, session_id, body.message)
+    if answer is not None:
+        return StreamingResponse(
+            _answer_events(session_id, answer), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    ticket = _reserve_generation(user.id)
+
+    try:
+        # Save user message
+        await save_chat_message(db, user.id, session_id, "user", body.message)
+        await db.flush()
+
+        # Get conversation history (newest turns within the token budget)
+        messages = await load_history(db, user.id, session_id)
+        # build_context may fan out over other pooled sessions; don't hold ours
+        # while waiting for them
+        await db.commit()
+        messages, context, tools = await _prepare_prompt(db, user, body, messages)
+
+        cache_key = _response_cache_key(messages, context, tools)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            ticket.release()
+            await save_chat_message(db, user.id, session_id, "assistant", cached, mode="cache")
+            produce = partial(_replay_reply, cached)
+        else:
+            produce = partial(
+                _stream_reply, ticket, user.id, session_id, messages, context, tools, cache_key
+            )
+
+        # Return the pooled connection now rather than holding it for the whole
+        # stream; the reply is saved through its own short-lived session.
+        await db.commit()
+    except Exception:
+        ticket.release()
+        raise
 
     async def generate():
-        full_response = []
-        yield f"data: {json.dumps({'sessionId': session_id})}\n\n"
+        yield sse_event({"sessionId": session_id})
+
+        events: asyncio.Queue = asyncio.Queue()
+        reply = asyncio.create_task(produce(events))
+        _reply_tasks.add(reply)
+        reply.add_done_callback(_reply_tasks.discard)
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, reply))
+        reply.add_done_callback(lambda _: watcher.cancel())
 
         try:
-            async for token in stream_ollama_response(messages, context):
-                full_response.append(token)
-                yield f"data: {json.dumps({'token': token})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'token': f'Error: {str(e)}'})}\n\n"
-
-        # Save the complete assistant message
-        complete_text = "".join(full_response)
-        if complete_text:
-            from server.database import AsyncSessionLocal
-
-            async with AsyncSessionLocal() as save_db:
-                try:
-                    assistant_msg = ChatMessage(
-                        user_id=user.id,
-                        role="assistant",
-                        content=complete_text,
-                        mode="ollama",
-                        session_id=session_id,
-                    )
-                    save_db.add(assistant_msg)
-                    await save_db.commit()
-                except Exception:
-                    await save_db.rollback()
-
-        yield f"data: {json.dumps({'done': True})}\n\n"
+            async for frame in coalesced_frames(events):
+                yield frame
+        finally:
+            # No-op once the reply is done; otherwise the client went away
+            reply.cancel()
+            watcher.cancel()
+
+        yield sse_event({"done": True})
 
     return StreamingResponse(
         generate(),
+        # Also frees the slot if the client goes away before generate() starts
+        background=BackgroundTask(_release_ticket, ticket),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -151,47 +295,110 @@ async def chat_stream(
     )
 
 
+@router.post("/chat/prewarm", status_code=202)
+async def prewarm_chat(
+    user=Depends(get_current_user),
+):
+    """Build context and load the model ahead of the first message (fire and forget)."""
+    return {"started": prewarm(user.id)}
+
+
 @router.get("/chat/history")
 async def get_history(
     sessionId: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    before: int | None = None,
+    after: int | None = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
+    """One page of a session, oldest first.
+
+    Without a cursor this is the latest page. Pass the first message's id as
+    before to page back, or the last message's id as after to page forward.
+    """
     if not sessionId:
         return []
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both")
 
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.user_id == user.id, ChatMessage.session_id == sessionId)
-        .order_by(ChatMessage.created_at)
+    limit = max(1, min(limit, 200))
+    query = select(ChatMessage).where(
+        ChatMessage.user_id == user.id, ChatMessage.session_id == sessionId
     )
-    return [m.to_dict() for m in result.scalars().all()]
+    cursor_id = before if before is not None else after
+    if cursor_id is not None:
+        cursor_at = (
+            select(ChatMessage.created_at)
+            .where(ChatMessage.id == cursor_id, ChatMessage.user_id == user.id)
+            .scalar_subquery()
+        )
+        if before is not None:
+            query = query.where(
+                or_(
+                    ChatMessage.created_at < cursor_at,
+                    and_(ChatMessage.created_at == cursor_at, ChatMessage.id < cursor_id),
+                )
+            )
+        else:
+            query = query.where(
+                or_(
+                    ChatMessage.created_at > cursor_at,
+                    and_(ChatMessage.created_at == cursor_at, ChatMessage.id > cursor_id),
+                )
+            )
+
+    if after is not None:
+        query = query.order_by(ChatMessage.created_at, ChatMessage.id)
+    else:
+        query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    result = await db.execute(query.limit(limit))
+    messages = result.scalars().all()
+    if after is None:
+        messages.reverse()
+    return [m.to_dict() for m in messages]
+
+
+def _session_cursor(session: ChatSession) -> str:
+    last_message_at = session.last_message_at
+    if last_message_at.tzinfo is None:
+        # SQLite returns naive datetimes; the stored values are UTC
+        last_message_at = last_message_at.replace(tzinfo=timezone.utc)
+    micros = (last_message_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{session.id}"
+
+
+def _parse_session_cursor(cursor: str):
+    try:
+        micros, session_pk = (int(part) for part in cursor.split("."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return _EPOCH + timedelta(microseconds=micros), session_pk
 
 
 @router.get("/chat/sessions")
 async def get_sessions(
-    db: AsyncSession = Depends(get_db),
+    before: str | None = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
-    result = await db.execute(
-        select(
-            ChatMessage.session_id,
-            func.min(ChatMessage.created_at).label("started"),
-            func.max(ChatMessage.created_at).label("last_message"),
-            func.count(ChatMessage.id).label("message_count"),
+    """Sessions by most recent message. Pass an item's cursor as before for the next page."""
+    query = select(ChatSession).where(ChatSession.user_id == user.id)
+    if before:
+        last_message_at, session_pk = _parse_session_cursor(before)
+        query = query.where(
+            or_(
+                ChatSession.last_message_at < last_message_at,
+                and_(ChatSession.last_message_at == last_message_at, ChatSession.id < session_pk),
+            )
         )
-        .where(ChatMessage.user_id == user.id)
-        .group_by(ChatMessage.session_id)
-        .order_by(func.max(ChatMessage.created_at).desc())
+    result = await db.execute(
+        query.order_by(ChatSession.last_message_at.desc(), ChatSession.id.desc())
+        .limit(max(1, min(limit, 100)))
     )
     return [
-        {
-            "sessionId": row.session_id,
-            "started": row.started.isoformat(),
-            "lastMessage": row.last_message.isoformat(),
-            "messageCount": row.message_count,
-        }
-        for row in result.all()
+        {**s.to_dict(), "cursor": _session_cursor(s)} for s in result.scalars().all()
     ]
 
 
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from server.database import get_db
 from server.auth import get_current_user
 from server.models.focus import FocusSession
+from server.services.context_cache import invalidate_context
 
 router = APIRouter(prefix="")
 
@@ -100,6 +101,7 @@ async def create_session(
         habit_categories=json.dumps(body.habitCategories),
     )
     db.add(session)
+    invalidate_context(db, user.id, "focus")
     await db.flush()
     await db.refresh(session)
     return JSONResponse(content=session.to_dict(), status_code=201)
@@ -149,6 +151,7 @@ async def update_session(
     if body.habitCategories is not None:
         session.habit_categories = json.dumps(body.habitCategories)
 
+    invalidate_context(db, user.id, "focus")
     await db.flush()
     await db.refresh(session)
     return session.to_dict()
@@ -170,5 +173,6 @@ async def delete_session(
         raise HTTPException(status_code=404, detail="Session not found")
 
     await db.delete(session)
+    invalidate_context(db, user.id, "focus")
     await db.flush()
     return {"message": "Session deleted"}
@@ -7,12 +7,13 @@ from fastapi.responses import JSONResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.database import get_db
+from server.database import get_db, get_read_db
 from server.auth import get_current_user
 from server.models.goal import Goal
 from server.models.note import Note
 from server.models.thought import ThoughtPost
 from server.models.calendar_event import CalendarEvent
+from server.services.context_cache import invalidate_context
 
 router = APIRouter(prefix="")
 
@@ -39,7 +40,7 @@ class GoalUpdate(BaseModel):
 
 @router.get("/goals")
 async def get_goals(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     result = await db.execute(
@@ -67,6 +68,7 @@ async def create_goal(
         color=body.color,
     )
     db.add(goal)
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     await db.refresh(goal)
     return JSONResponse(content=goal.to_dict(), status_code=201)
@@ -75,7 +77,7 @@ async def create_goal(
 @router.get("/goals/{id}")
 async def get_goal(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     result = await db.execute(
@@ -144,6 +146,7 @@ async def update_goal(
     if body.color is not None:
         goal.color = body.color
 
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     await db.refresh(goal)
     return goal.to_dict()
@@ -163,5 +166,6 @@ async def delete_goal(
         raise HTTPException(status_code=404, detail="Goal not found")
 
     await db.delete(goal)
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     return {"message": "Goal deleted"}
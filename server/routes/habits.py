@@ -3,7 +3,7 @@ from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,11 +11,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from server.database import get_db
 from server.auth import get_current_user
 from server.models.habit import HabitLog, CustomHabit, CustomHabitLog
+from server.services.context_cache import invalidate_context
+from server.services.habits import HABIT_CATEGORIES, habit_streaks
 
 router = APIRouter(prefix="")
 
-VALID_CATEGORIES = ["sleep", "fitness", "finance", "diet_health"]
-
 
 def _week_bounds(d):
     monday = d - timedelta(days=d.weekday())
@@ -23,49 +23,6 @@ def _week_bounds(d):
     return monday, sunday
 
 
-async def _preset_completed_on(db, user_id, category, d):
-    result = await db.execute(
-        select(HabitLog).where(
-            HabitLog.user_id == user_id,
-            HabitLog.date == d,
-            HabitLog.category == category,
-        )
-    )
-    log = result.scalar_one_or_none()
-    return log.is_completed if log else False
-
-
-async def _custom_completed_on(db, user_id, habit, d):
-    result = await db.execute(
-        select(CustomHabitLog).where(
-            CustomHabitLog.user_id == user_id,
-            CustomHabitLog.date == d,
-            CustomHabitLog.custom_habit_id == habit.id,
-        )
-    )
-    log = result.scalar_one_or_none()
-    if not log or not log.value:
-        return False
-    if habit.tracking_type == "checkbox":
-        return log.value == "true"
-    try:
-        return float(log.value) > 0
-    except (ValueError, TypeError):
-        return False
-
-
-async def _calc_streak(db, user_id, check_fn, max_days=90):
-    streak = 0
-    today = date.today()
-    for offset in range(max_days):
-        check_date = today - timedelta(days=offset)
-        if await check_fn(db, user_id, check_date):
-            streak += 1
-        else:
-            break
-    return streak
-
-
 class CustomHabitCreate(BaseModel):
     name: str
     trackingType: Optional[str] = "checkbox"
@@ -88,19 +45,17 @@ class CustomHabitUpdate(BaseModel):
 
 @router.get("/habits/week")
 async def get_week(
-    date: Optional[str] = None,
+    day: Optional[str] = Query(None, alias="date"),
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    if date:
+    if day:
         try:
-            from datetime import date as date_type
-            d = date_type.fromisoformat(date)
+            d = date.fromisoformat(day)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date")
     else:
-        from datetime import date as date_type
-        d = date_type.today()
+        d = date.today()
 
     monday, sunday = _week_bounds(d)
 
@@ -147,18 +102,8 @@ async def get_week(
             custom_logs_by_day[day_str] = {}
         custom_logs_by_day[day_str][str(cl.custom_habit_id)] = cl.to_dict()
 
-    # Streaks
-    streaks = {}
-    for cat in VALID_CATEGORIES:
-        streaks[cat] = await _calc_streak(
-            db, user.id,
-            lambda db, uid, d, c=cat: _preset_completed_on(db, uid, c, d),
-        )
-    for habit in custom_habits:
-        streaks[f"custom_{habit.id}"] = await _calc_streak(
-            db, user.id,
-            lambda db, uid, d, h=habit: _custom_completed_on(db, uid, h, d),
-        )
+    # Streaks, batched rather than one query per habit and day
+    streaks = await habit_streaks(db, user.id, date.today())
 
     return {
         "weekStart": monday.isoformat(),
@@ -178,7 +123,7 @@ async def upsert_preset_log(
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    if category not in VALID_CATEGORIES:
+    if category not in HABIT_CATEGORIES:
         raise HTTPException(status_code=400, detail=f"Invalid category: {category}")
 
     try:
@@ -208,6 +153,7 @@ async def upsert_preset_log(
         )
         db.add(log)
 
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     await db.refresh(log)
     return log.to_dict()
@@ -220,7 +166,7 @@ async def delete_preset_log(
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    if category not in VALID_CATEGORIES:
+    if category not in HABIT_CATEGORIES:
         raise HTTPException(status_code=400, detail=f"Invalid category: {category}")
 
     try:
@@ -241,6 +187,7 @@ async def delete_preset_log(
         raise HTTPException(status_code=404, detail="Log not found")
 
     await db.delete(log)
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     return {"message": "Log deleted"}
 
@@ -283,6 +230,7 @@ async def create_custom_habit(
         position=max_pos + 1,
     )
     db.add(habit)
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     await db.refresh(habit)
     return JSONResponse(content=habit.to_dict(), status_code=201)
@@ -319,6 +267,7 @@ async def update_custom_habit(
     if body.position is not None:
         habit.position = body.position
 
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     await db.refresh(habit)
     return habit.to_dict()
@@ -338,6 +287,7 @@ async def delete_custom_habit(
         raise HTTPException(status_code=404, detail="Habit not found")
 
     await db.delete(habit)
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     return {"message": "Habit deleted"}
 
@@ -383,6 +333,7 @@ async def upsert_custom_log(
         )
         db.add(log)
 
+    invalidate_context(db, user.id, "habits")
     await db.flush()
     await db.refresh(log)
     return log.to_dict()
@@ -0,0 +1,41 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from server.auth import bcrypt_stats
+from server.config import settings
+from server.database import engine, read_engine, pool_stats
+from server.services.llm_scheduler import llm_scheduler
+from server.services.ollama_service import backend_stats
+from server.services.response_cache import cache_stats
+from server.services import user_cache
+
+
+def require_internal_token(x_internal_token: str | None = Header(None)):
+    """Operator endpoints are off unless INTERNAL_API_TOKEN is set, then need it."""
+    if not settings.INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_internal_token or not hmac.compare_digest(
+        x_internal_token, settings.INTERNAL_API_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+router = APIRouter(prefix="", dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/stats")
+async def get_stats():
+    return {
+        "responseCache": cache_stats(),
+        "userCache": user_cache.cache_stats(),
+        "bcrypt": bcrypt_stats(),
+        "dbPool": pool_stats(),
+        "dbReplicaPool": pool_stats(read_engine) if read_engine is not engine else None,
+        "ollamaBackends": backend_stats(),
+        "llmScheduler": {
+            "active": llm_scheduler.active,
+            "queued": llm_scheduler.queued,
+            "maxConcurrency": llm_scheduler.max_concurrency,
+        },
+    }
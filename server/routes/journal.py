@@ -9,6 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from server.database import get_db
 from server.auth import get_current_user
 from server.models.journal import JournalEntry
+from server.services.context_cache import invalidate_context
+from server.services.embedding_index import index_document
 
 router = APIRouter(prefix="")
 
@@ -89,6 +91,8 @@ async def update_entry(
     if body.eveningReflection is not None:
         entry.evening_reflection = body.eveningReflection
 
+    invalidate_context(db, user.id, "journal")
+    index_document(db, user.id, entry)
     await db.flush()
     await db.refresh(entry)
     return entry.to_dict()
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from server.database import get_db
 from server.auth import get_current_user
 from server.models.goal import Goal, Milestone, SubMilestone
+from server.services.context_cache import invalidate_context
 
 router = APIRouter(prefix="")
 
@@ -93,6 +94,7 @@ async def create_milestone(
     )
     db.add(milestone)
     _recalculate_progress(goal)
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     await db.refresh(milestone)
     await db.refresh(goal)
@@ -129,6 +131,7 @@ async def update_milestone(
     goal = goal_result.scalar_one_or_none()
     _recalculate_progress(goal)
 
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     await db.refresh(milestone)
     await db.refresh(goal)
@@ -154,6 +157,7 @@ async def delete_milestone(
     goal = goal_result.scalar_one_or_none()
 
     await db.delete(milestone)
+    invalidate_context(db, user.id, "goals")
     await db.flush()
     _recalculate_progress(goal)
     await db.flush()
@@ -6,9 +6,11 @@ from fastapi.responses import JSONResponse
 from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.database import get_db
+from server.database import get_db, get_read_db
 from server.auth import get_current_user
 from server.models.note import Note
+from server.services.context_cache import invalidate_context
+from server.services.embedding_index import index_document, unindex_document
 
 router = APIRouter(prefix="")
 
@@ -36,7 +38,7 @@ async def get_notes(
     search: Optional[str] = None,
     tag: Optional[str] = None,
     goal_id: Optional[int] = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     query = select(Note).where(Note.user_id == user.id)
@@ -77,6 +79,8 @@ async def create_note(
         goal_id=body.goalId,
     )
     db.add(note)
+    invalidate_context(db, user.id, "notes")
+    index_document(db, user.id, note)
     await db.flush()
     await db.refresh(note)
     return JSONResponse(content=note.to_dict(), status_code=201)
@@ -85,7 +89,7 @@ async def create_note(
 @router.get("/notes/{id}")
 async def get_note(
     id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user),
 ):
     result = await db.execute(
@@ -124,6 +128,8 @@ async def update_note(
     if body.goalId is not None:
         note.goal_id = body.goalId
 
+    invalidate_context(db, user.id, "notes")
+    index_document(db, user.id, note)
     await db.flush()
     await db.refresh(note)
     return note.to_dict()
@@ -143,5 +149,7 @@ async def delete_note(
         raise HTTPException(status_code=404, detail="Note not found")
 
     await db.delete(note)
+    invalidate_context(db, user.id, "notes")
+    unindex_document(db, user.id, "note", note.id)
     await db.flush()
     return {"message": "Note deleted"}
@@ -11,6 +11,7 @@ from server.auth import get_current_user
 from server.models.tag import CustomTag
 from server.models.note import Note
 from server.models.thought import ThoughtPost
+from server.services.embedding_index import index_document
 
 router = APIRouter(prefix="")
 
@@ -85,6 +86,8 @@ async def _propagate_tag_rename(db, user_id, old_name, new_name):
             tags = [t.strip() for t in item.tags.split(",") if t.strip()]
             tags = [new_name if t == old_name else t for t in tags]
             item.tags = ",".join(tags)
+            # Tags are part of the indexed text
+            index_document(db, user_id, item)
 
 
 async def _remove_tag_from_items(db, user_id, tag_name):
@@ -99,6 +102,7 @@ async def _remove_tag_from_items(db, user_id, tag_name):
             tags = [t.strip() for t in item.tags.split(",") if t.strip()]
             tags = [t for t in tags if t != tag_name]
             item.tags = ",".join(tags)
+            index_document(db, user_id, item)
 
 
 @router.put("/tags/{id}")
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from server.database import get_db
 from server.auth import get_current_user
 from server.models.thought import Community, ThoughtPost, Comment, Vote
+from server.services.embedding_index import index_document, unindex_document
 
 router = APIRouter(prefix="")
 
@@ -80,6 +81,11 @@ async def delete_community(
     if not community:
         raise HTTPException(status_code=404, detail="Community not found")
 
+    # Its posts go with it (delete-orphan cascade)
+    post_ids = await db.execute(select(ThoughtPost.id).where(ThoughtPost.community_id == id))
+    for post_id in post_ids.scalars().all():
+        unindex_document(db, user.id, "thought", post_id)
+
     await db.delete(community)
     await db.flush()
     return {"message": "Community deleted"}
@@ -128,6 +134,7 @@ async def create_post(
         goal_id=body.get("goalId"),
     )
     db.add(post)
+    index_document(db, user.id, post)
     await db.flush()
     await db.refresh(post)
     return JSONResponse(content=post.to_dict(), status_code=201)
@@ -216,6 +223,7 @@ async def update_post(
     if "goalId" in body:
         post.goal_id = body["goalId"]
 
+    index_document(db, user.id, post)
     await db.flush()
     await db.refresh(post)
     return post.to_dict()
@@ -251,6 +259,7 @@ async def delete_post(
         )
 
     await db.delete(post)
+    unindex_document(db, user.id, "thought", post.id)
     await db.flush()
     return {"message": "Post deleted"}
 
@@ -6,8 +6,9 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from server.database import get_db
-from server.auth import get_current_user, verify_password, hash_password
+from server.auth import get_current_user, verify_password, hash_password, create_access_token
 from server.models.user import User
+from server.services.user_cache import invalidate_user
 
 router = APIRouter(prefix="")
 
@@ -57,6 +58,7 @@ async def update_profile(
 
     await db.flush()
     await db.refresh(user)
+    invalidate_user(db, user.id)
     return user.to_dict()
 
 
@@ -66,12 +68,15 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    if not verify_password(body.currentPassword, user.password_hash):
+    if not await verify_password(body.currentPassword, user.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
     if len(body.newPassword) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    user.password_hash = hash_password(body.newPassword)
+    user.password_hash = await hash_password(body.newPassword)
+    user.token_version += 1
     await db.flush()
-    return {"message": "Password updated successfully"}
+    invalidate_user(db, user.id)
+    # Older tokens, including the one on this request, no longer validate
+    return {"message": "Password updated successfully", "token": create_access_token(user.id, user.token_version)}
@@ -0,0 +1,350 @@
+"""
+Token-budgeted conversation history for the chat endpoints.
+
+Each ChatMessage stores an estimated token count. load_history() walks a session
+from the newest message backwards until CHAT_HISTORY_TOKEN_BUDGET is spent, so
+the prompt stays bounded however long the session runs. Turns that fall out of
+that window are folded into a rolling ChatSessionSummary row by a background task,
+and the summary is sent ahead of the window instead of the raw turns.
+
+The newest CHAT_HISTORY_MAX_MESSAGES turns of recently active sessions are also
+kept in process (LRU over CHAT_RECENT_CACHE_SESSIONS sessions). Messages saved
+through save_chat_message() are appended once their transaction commits, so a
+chat turn only reads the session's messages when they are not cached. Each
+worker has its own cache and any of them may save a session's turns, so the
+cache also counts the session's messages: the chat_sessions upsert that saves a
+turn returns the session's message_count, and a hit whose count falls short of
+it (another worker saved turns meanwhile) is reloaded instead of used.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.config import settings
+from server.database import AsyncSessionLocal
+from server.models.chat_message import ChatMessage, ChatSession, ChatSessionSummary
+from server.services.ollama_service import complete_ollama
+from server.services.llm_scheduler import llm_scheduler, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and their "
+    "productivity assistant. Merge the existing summary with the new turns into one "
+    "compact summary of at most 150 words. Keep facts, decisions, plans and open "
+    "questions; drop greetings and filler. Reply with the summary only."
+)
+
+# Sessions with a summary update in flight, and strong refs to their tasks
+_pending_summaries: set[tuple[int, str]] = set()
+_summary_tasks: set[asyncio.Task] = set()
+
+
+class _Turn(NamedTuple):
+    id: int
+    role: str
+    content: str
+    token_count: int | None
+
+    @classmethod
+    def of(cls, message: ChatMessage) -> "_Turn":
+        return cls(message.id, message.role, message.content, message.token_count)
+
+
+class _RecentTurns:
+    """The newest turns of one session, oldest first."""
+
+    def __init__(self, turns, has_older: bool, message_count: int | None):
+        self.turns = deque(turns, maxlen=settings.CHAT_HISTORY_MAX_MESSAGES)
+        self.has_older = has_older
+        # Committed messages in the session, as chat_sessions.message_count counts them
+        self.message_count = message_count
+
+    def append(self, turn: _Turn):
+        if len(self.turns) == self.turns.maxlen:
+            self.has_older = True
+        self.turns.append(turn)
+        if self.message_count is not None:
+            self.message_count += 1
+
+
+# (user_id, session_id) -> recent turns, least recently used first
+_recent: OrderedDict[tuple[int, str], _RecentTurns] = OrderedDict()
+# Sessions being read from the database, and those a commit raced while reading
+_loading: dict[tuple[int, str], int] = {}
+_raced: set[tuple[int, str]] = set()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)."""
+    return len(text or "") // 4 + 4
+
+
+async def save_chat_message(
+    db: AsyncSession,
+    user_id: int,
+    session_id: str,
+    role: str,
+    content: str,
+    mode="ollama",
+    truncated=False,
+) -> ChatMessage:
+    """Add a message to db and bump its row in chat_sessions in the same transaction.
+
+    The message joins the recent-turns cache once the transaction commits, and
+    the session's message count (this message included) is kept in the session
+    info for load_history to check the cache against.
+    """
+    now = datetime.now(timezone.utc)
+    message = ChatMessage(
+        user_id=user_id,
+        role=role,
+        content=content,
+        mode=mode,
+        session_id=session_id,
+        token_count=estimate_tokens(content),
+        truncated=truncated,
+        created_at=now,
+    )
+    db.add(message)
+    result = await db.execute(_touch_session(db, user_id, session_id, role, content, now))
+    info = db.sync_session.info
+    info.setdefault("chat_counts", {})[(user_id, session_id)] = result.scalar_one()
+    info.setdefault("chat_turns", []).append(message)
+    return message
+
+
+def _touch_session(db: AsyncSession, user_id: int, session_id: str, role: str, content: str, now):
+    # INSERT ... ON CONFLICT DO UPDATE; both supported dialects spell it the same way
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    stmt = insert(ChatSession).values(
+        user_id=user_id,
+        session_id=session_id,
+        title=content[:80] if role == "user" else None,
+        started_at=now,
+        last_message_at=now,
+        message_count=1,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[ChatSession.user_id, ChatSession.session_id],
+        set_={
+            "last_message_at": stmt.excluded.last_message_at,
+            "message_count": ChatSession.message_count + 1,
+        },
+    ).returning(ChatSession.message_count)
+
+
+async def load_history(db: AsyncSession, user_id: int, session_id: str) -> list[dict]:
+    """Return the Ollama message list for a session, newest turns within the token budget.
+
+    The newest message is always included, even if it alone exceeds the budget.
+    """
+    key = (user_id, session_id)
+    uncommitted = [
+        m for m in db.sync_session.info.get("chat_turns", ())
+        if (m.user_id, m.session_id) == key
+    ]
+    # Set by this transaction's save_chat_message(); otherwise read it
+    message_count = db.sync_session.info.get("chat_counts", {}).get(key)
+    recent = _recent.get(key)
+    if recent is not None:
+        if message_count is None:
+            message_count = await db.scalar(
+                select(ChatSession.message_count).where(
+                    ChatSession.user_id == user_id, ChatSession.session_id == session_id
+                )
+            ) or 0
+        if recent.message_count != message_count - len(uncommitted):
+            # Another worker saved turns since we cached the session
+            if _recent.get(key) is recent:
+                del _recent[key]
+            recent = None
+    if recent is None:
+        recent = await _load_recent(db, key, uncommitted, message_count)
+    elif key in _recent:
+        _recent.move_to_end(key)
+
+    # Newest first, including this transaction's own not yet committed messages
+    rows = [_Turn.of(m) for m in reversed(uncommitted)] + list(reversed(recent.turns))
+    has_older = recent.has_older or len(rows) > settings.CHAT_HISTORY_MAX_MESSAGES
+    rows = rows[:settings.CHAT_HISTORY_MAX_MESSAGES]
+
+    window = []
+    used = 0
+    for m in rows:
+        tokens = m.token_count or estimate_tokens(m.content)
+        if window and used + tokens > settings.CHAT_HISTORY_TOKEN_BUDGET:
+            break
+        window.append(m)
+        used += tokens
+    window.reverse()
+
+    messages = [{"role": m.role, "content": m.content} for m in window]
+    if len(window) == len(rows) and not has_older:
+        return messages
+
+    result = await db.execute(
+        select(ChatSessionSummary).where(
+            ChatSessionSummary.user_id == user_id,
+            ChatSessionSummary.session_id == session_id,
+        )
+    )
+    summary = result.scalar_one_or_none()
+    boundary_id = window[0].id
+    # Ids are global, not consecutive per session: compare against the newest
+    # message that fell out of the window rather than boundary_id - 1
+    if len(window) < len(rows):
+        dropped_id = rows[len(window)].id
+    else:
+        dropped_id = await db.scalar(
+            select(func.max(ChatMessage.id)).where(
+                ChatMessage.user_id == user_id,
+                ChatMessage.session_id == session_id,
+                ChatMessage.id < boundary_id,
+            )
+        )
+    if dropped_id is not None and (summary is None or summary.summarized_through_id < dropped_id):
+        schedule_summary_update(user_id, session_id, boundary_id)
+    if summary and summary.summary:
+        messages.insert(0, {
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{summary.summary}",
+        })
+    return messages
+
+
+async def _load_recent(
+    db: AsyncSession, key: tuple[int, str], uncommitted: list, message_count: int | None
+) -> _RecentTurns:
+    user_id, session_id = key
+    _loading[key] = _loading.get(key, 0) + 1
+    try:
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.user_id == user_id, ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(settings.CHAT_HISTORY_MAX_MESSAGES)
+        )
+        rows = result.scalars().all()
+    finally:
+        _loading[key] -= 1
+        if not _loading[key]:
+            del _loading[key]
+    raced = key in _raced
+    if key not in _loading:
+        _raced.discard(key)
+
+    # Our own pending messages (flushed by now) are appended when the transaction commits
+    pending_ids = {m.id for m in uncommitted}
+    recent = _RecentTurns(
+        [_Turn.of(m) for m in reversed(rows) if m.id not in pending_ids],
+        has_older=len(rows) == settings.CHAT_HISTORY_MAX_MESSAGES,
+        # Unknown without a save in this transaction; the next hit reads it
+        message_count=None if message_count is None else message_count - len(uncommitted),
+    )
+    if not raced:
+        _recent[key] = recent
+        while len(_recent) > settings.CHAT_RECENT_CACHE_SESSIONS:
+            _recent.popitem(last=False)
+    return recent
+
+
+@event.listens_for(Session, "after_commit")
+def _append_committed_turns(session):
+    session.info.pop("chat_counts", None)
+    for message in session.info.pop("chat_turns", ()):
+        key = (message.user_id, message.session_id)
+        recent = _recent.get(key)
+        if recent is not None:
+            recent.append(_Turn.of(message))
+        elif key in _loading:
+            # A concurrent read may have missed this message; don't cache its result
+            _raced.add(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted_turns(session):
+    session.info.pop("chat_turns", None)
+    session.info.pop("chat_counts", None)
+
+
+def schedule_summary_update(user_id: int, session_id: str, boundary_id: int):
+    """Fold turns older than boundary_id into the session summary in the background."""
+    key = (user_id, session_id)
+    if key in _pending_summaries:
+        return
+    _pending_summaries.add(key)
+
+    task = asyncio.create_task(_update_summary(user_id, session_id, boundary_id))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+    task.add_done_callback(lambda _: _pending_summaries.discard(key))
+
+
+async def _update_summary(user_id: int, session_id: str, boundary_id: int):
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(
+                select(ChatSessionSummary).where(
+                    ChatSessionSummary.user_id == user_id,
+                    ChatSessionSummary.session_id == session_id,
+                )
+            )
+            summary = result.scalar_one_or_none()
+            through_id = summary.summarized_through_id if summary else 0
+
+            result = await db.execute(
+                select(ChatMessage)
+                .where(
+                    ChatMessage.user_id == user_id,
+                    ChatMessage.session_id == session_id,
+                    ChatMessage.id > through_id,
+                    ChatMessage.id < boundary_id,
+                )
+                .order_by(ChatMessage.id)
+                .limit(settings.CHAT_SUMMARY_BATCH_MESSAGES)
+            )
+            turns = result.scalars().all()
+            if not turns:
+                return
+
+            transcript = "\n".join(f"{m.role}: {m.content}" for m in turns)
+            previous = summary.summary if summary and summary.summary else "(none yet)"
+            # Hand the connection back to the pool while waiting on the model
+            await db.commit()
+
+            # Summaries share the user's fair share of LLM slots with their chats
+            async with llm_scheduler.slot(user_id):
+                text = await complete_ollama(
+                    [{
+                        "role": "user",
+                        "content": f"Existing summary:\n{previous}\n\nNew turns:\n{transcript}",
+                    }],
+                    SUMMARY_PROMPT,
+                )
+            text = text.strip()
+            if not text:
+                return
+
+            if summary is None:
+                summary = ChatSessionSummary(user_id=user_id, session_id=session_id)
+                db.add(summary)
+            summary.summary = text
+            summary.summarized_through_id = turns[-1].id
+            summary.token_count = estimate_tokens(text)
+            await db.commit()
+        except QueueFullError:
+            # Busy; the next turn that still overflows the window will retry
+            await db.rollback()
+        except Exception:
+            await db.rollback()
+            logger.exception("Failed to update chat summary for session %s", session_id)
@@ -0,0 +1,217 @@
+"""
+Long-term memory across chat sessions.
+
+A scheduler job finds sessions that have been idle for CHAT_MEMORY_IDLE_MINUTES
+and have messages not yet memorized, and asks the model to distil each into a
+few standalone facts. Each fact becomes a ChatMemory row, embedded into the
+user's memory index (see embedding_index), and chat turns retrieve the top
+CHAT_MEMORY_TOP_K of them for the new message.
+
+Cost stays sub-linear in history: a session is read once when it goes idle
+(again only if it is resumed), and the pending-sessions index means the job
+never scans memorized sessions. Retrieval is a brute-force search of the
+user's memory index, so the set is capped: beyond CHAT_MEMORY_MAX_PER_USER
+the oldest memories are dropped, and a search costs the same however long
+the history grows.
+
+Every worker runs the job, so a session is claimed before it is memorized: a
+conditional UPDATE marks it memorized through its last message, and only the
+worker whose update matched a row goes on. A failed run hands the claim back.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete, or_, update
+
+from server.config import settings
+from server.database import AsyncSessionLocal
+from server.models.chat_message import ChatMessage, ChatSession, ChatSessionSummary, ChatMemory
+from server.services.embedding_index import index_document, unindex_document
+from server.services.llm_scheduler import llm_scheduler, QueueFullError
+from server.services.ollama_service import complete_ollama
+
+logger = logging.getLogger(__name__)
+
+MEMORY_PROMPT = (
+    "You extract long-term memories from a conversation between a user and their "
+    "productivity assistant. List at most 5 facts worth remembering in later "
+    "conversations: the user's plans, decisions, preferences, progress and problems. "
+    "Write each as one standalone sentence about the user on its own line starting "
+    "with \"- \". Skip greetings, small talk and anything the assistant merely "
+    "suggested. Reply NONE if nothing is worth remembering."
+)
+MAX_FACTS = 5
+MAX_FACT_CHARS = 300
+
+
+def _parse_facts(text: str) -> list[str]:
+    facts = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith(("-", "*", "•")):
+            continue
+        fact = line.lstrip("-*• ").strip()
+        if fact and fact.upper() != "NONE":
+            facts.append(fact[:MAX_FACT_CHARS])
+    return facts[:MAX_FACTS]
+
+
+async def memorize_session(session_pk: int):
+    """Replace a session's memories with facts from its current messages."""
+    claimed = False
+    async with AsyncSessionLocal() as db:
+        try:
+            session = await db.get(ChatSession, session_pk)
+            if session is None or session.last_message_at is None:
+                return
+            previous, through = session.memorized_at, session.last_message_at
+            if not await _claim(db, session_pk, previous, through):
+                # Another worker is memorizing it, or already has
+                await db.rollback()
+                return
+
+            result = await db.execute(
+                select(ChatMessage)
+                .where(
+                    ChatMessage.user_id == session.user_id,
+                    ChatMessage.session_id == session.session_id,
+                )
+                .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+                .limit(settings.CHAT_MEMORY_MAX_MESSAGES)
+            )
+            turns = list(reversed(result.scalars().all()))
+            result = await db.execute(
+                select(ChatSessionSummary.summary).where(
+                    ChatSessionSummary.user_id == session.user_id,
+                    ChatSessionSummary.session_id == session.session_id,
+                )
+            )
+            earlier = result.scalar_one_or_none()
+            # Commit the claim and hand the connection back while waiting on the model
+            await db.commit()
+            claimed = True
+
+            facts = []
+            if any(m.role == "user" for m in turns):
+                transcript = "\n".join(f"{m.role}: {m.content}" for m in turns)
+                if earlier:
+                    transcript = f"Summary of earlier turns: {earlier}\n\n{transcript}"
+                async with llm_scheduler.slot(session.user_id):
+                    text = await complete_ollama(
+                        [{"role": "user", "content": transcript}], MEMORY_PROMPT
+                    )
+                facts = _parse_facts(text)
+
+            result = await db.execute(
+                select(ChatMemory.id).where(
+                    ChatMemory.user_id == session.user_id,
+                    ChatMemory.session_id == session.session_id,
+                )
+            )
+            for memory_id in result.scalars().all():
+                unindex_document(db, session.user_id, "memory", memory_id)
+            await db.execute(
+                delete(ChatMemory).where(
+                    ChatMemory.user_id == session.user_id,
+                    ChatMemory.session_id == session.session_id,
+                )
+            )
+            memories = [
+                ChatMemory(user_id=session.user_id, session_id=session.session_id, content=fact)
+                for fact in facts
+            ]
+            db.add_all(memories)
+            await db.flush()
+            for memory in memories:
+                index_document(db, session.user_id, memory)
+            await _prune_memories(db, session.user_id)
+
+            await db.commit()
+            logger.info(
+                "Memorized chat session %s for user %s (%d facts)",
+                session.session_id, session.user_id, len(facts),
+            )
+        except QueueFullError:
+            # Busy; the session goes back to pending and the next run retries it
+            await db.rollback()
+            if claimed:
+                await _release(session_pk, previous, through)
+        except Exception:
+            await db.rollback()
+            logger.exception("Failed to memorize chat session %s", session_pk)
+            if claimed:
+                await _release(session_pk, previous, through)
+
+
+async def _prune_memories(db, user_id: int):
+    """Drop the user's memories beyond the newest CHAT_MEMORY_MAX_PER_USER."""
+    result = await db.execute(
+        select(ChatMemory.id)
+        .where(ChatMemory.user_id == user_id)
+        .order_by(ChatMemory.created_at.desc(), ChatMemory.id.desc())
+        .offset(settings.CHAT_MEMORY_MAX_PER_USER)
+    )
+    stale = result.scalars().all()
+    if not stale:
+        return
+    for memory_id in stale:
+        unindex_document(db, user_id, "memory", memory_id)
+    await db.execute(delete(ChatMemory).where(ChatMemory.id.in_(stale)))
+
+
+async def _claim(db, session_pk: int, previous, through) -> bool:
+    """Mark a pending session memorized through `through`, unless memorized_at
+    moved since we read it. A concurrent claim waits for ours to commit and
+    then matches no row."""
+    result = await db.execute(
+        update(ChatSession)
+        .where(
+            ChatSession.id == session_pk,
+            ChatSession.memorized_at.is_not_distinct_from(previous),
+            or_(
+                ChatSession.memorized_at.is_(None),
+                ChatSession.memorized_at < ChatSession.last_message_at,
+            ),
+        )
+        .values(memorized_at=through)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def _release(session_pk: int, previous, through):
+    """Undo a committed claim so the session is pending again."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ChatSession)
+                .where(ChatSession.id == session_pk, ChatSession.memorized_at == through)
+                .values(memorized_at=previous)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception("Failed to release chat session %s for memorizing", session_pk)
+
+
+async def memorize_finished_sessions():
+    """Scheduler job: memorize up to CHAT_MEMORY_BATCH_SESSIONS idle, pending sessions."""
+    idle_since = datetime.now(timezone.utc) - timedelta(minutes=settings.CHAT_MEMORY_IDLE_MINUTES)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ChatSession.id)
+            .where(
+                or_(
+                    ChatSession.memorized_at.is_(None),
+                    ChatSession.memorized_at < ChatSession.last_message_at,
+                ),
+                ChatSession.last_message_at < idle_since,
+            )
+            .order_by(ChatSession.last_message_at)
+            .limit(settings.CHAT_MEMORY_BATCH_SESSIONS)
+        )
+        session_pks = result.scalars().all()
+
+    for session_pk in session_pks:
+        await memorize_session(session_pk)
@@ -0,0 +1,67 @@
+"""
+Speculative warm-up run when the chat panel opens, before the first message.
+
+prewarm() builds the user's context sections into the context cache, starts
+their embedding index build if there is none, and asks Ollama to load the
+model, all in the background. The first message then finds that work done
+instead of adding it to time-to-first-token.
+
+Prewarms are deduplicated: one at a time per user, none again for
+CHAT_PREWARM_TTL_SECONDS after one finishes, and the model load (which is
+shared by everyone) at most once per TTL.
+"""
+
+import asyncio
+import logging
+import time
+
+from server.config import settings
+from server.database import AsyncSessionLocal
+from server.services.context_builder import build_context
+from server.services.embedding_index import ensure_index
+from server.services.ollama_service import warm_ollama_model
+
+logger = logging.getLogger(__name__)
+
+# user_id -> monotonic time until which another prewarm is skipped
+_fresh_until: dict[int, float] = {}
+_running: dict[int, asyncio.Task] = {}
+_model_fresh_until = 0.0
+
+
+def prewarm(user_id: int) -> bool:
+    """Start a background prewarm for user_id; False if one is running or still fresh."""
+    now = time.monotonic()
+    if user_id in _running or _fresh_until.get(user_id, 0) > now:
+        return False
+
+    task = asyncio.get_running_loop().create_task(_prewarm(user_id))
+    _running[user_id] = task
+    task.add_done_callback(lambda _: _running.pop(user_id, None))
+    return True
+
+
+async def _build_context(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await build_context(db, user_id)
+
+
+async def _prewarm(user_id: int):
+    global _model_fresh_until
+    started = time.monotonic()
+    jobs = [_build_context(user_id)]
+    if started >= _model_fresh_until:
+        _model_fresh_until = started + settings.CHAT_PREWARM_TTL_SECONDS
+        jobs.append(warm_ollama_model())
+    try:
+        ensure_index(user_id)
+        await asyncio.gather(*jobs)
+    except Exception:
+        logger.exception("Chat prewarm failed for user %s", user_id)
+        return
+
+    now = time.monotonic()
+    _fresh_until[user_id] = now + settings.CHAT_PREWARM_TTL_SECONDS
+    for uid in [uid for uid, until in _fresh_until.items() if until <= now]:
+        del _fresh_until[uid]
+    logger.debug("Prewarmed chat for user %s in %.0f ms", user_id, (now - started) * 1000)
@@ -0,0 +1,197 @@
+"""
+Tools the model can call in "tools" chat mode instead of receiving build_context.
+
+The model gets TOOLS (a compact schema) and TOOLS_INSTRUCTIONS; a tool only
+queries the database when the model calls it, so small talk costs a few hundred
+prompt tokens while questions about the user's data still get exact answers.
+Each call runs on its own short-lived session so a reply never holds a pooled
+connection between rounds.
+"""
+
+import json
+import logging
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import select, or_
+
+from server.database import AsyncSessionLocal
+from server.models.calendar_event import CalendarEvent
+from server.models.goal import Goal
+from server.models.habit import CustomHabit
+from server.models.note import Note
+from server.services.context_builder import _strip_html
+from server.services.embedding_index import relevant_passages
+from server.services.habits import habit_streaks
+from server.services.recurrence import expand_recurring_events
+
+logger = logging.getLogger(__name__)
+
+TOOLS_INSTRUCTIONS = (
+    "You are a personal productivity assistant embedded in the user's productivity hub. "
+    "When a question depends on their calendar, goals, habits or notes, call a tool "
+    "rather than guessing, and answer from its result. For everything else just reply. "
+    "Be warm, concise, and practical."
+)
+
+
+def _tool(name: str, description: str, properties: dict | None = None, required=()):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": properties or {},
+                "required": list(required),
+            },
+        },
+    }
+
+
+TOOLS = [
+    _tool(
+        "list_events",
+        "Calendar events on a day.",
+        {"date": {"type": "string", "description": "YYYY-MM-DD; default today"}},
+    ),
+    _tool(
+        "get_goal_progress",
+        "Active goals with progress and milestones.",
+        {"query": {"type": "string", "description": "Optional words from the goal title"}},
+    ),
+    _tool("get_habit_streaks", "Current daily streak for each habit."),
+    _tool(
+        "search_notes",
+        "Search the user's notes, journal and thoughts.",
+        {"query": {"type": "string"}},
+        required=["query"],
+    ),
+]
+
+
+def user_tz(name: str | None):
+    try:
+        return ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def tools_prompt(tz) -> str:
+    now = datetime.now(tz)
+    return TOOLS_INSTRUCTIONS + "\n\nToday is " + now.strftime("%A, %B %d, %Y") + "."
+
+
+async def _list_events(db, user_id: int, tz, date: str | None = None):
+    day = datetime.fromisoformat(date).date() if date else datetime.now(tz).date()
+    day_start = datetime.combine(day, time.min, tzinfo=tz)
+    day_end = day_start + timedelta(days=1)
+
+    result = await db.execute(
+        select(CalendarEvent).where(
+            CalendarEvent.user_id == user_id,
+            CalendarEvent.start < day_end,
+            or_(
+                CalendarEvent.end >= day_start,
+                # Recurring events generate forward from their first start
+                (CalendarEvent.recurrence != "") & CalendarEvent.recurrence.isnot(None),
+            ),
+        )
+    )
+    events = expand_recurring_events(
+        [e.to_dict() for e in result.scalars().all()], day_start, day_end
+    )
+    events = [
+        e for e in events
+        if datetime.fromisoformat(e["start"]) < day_end
+        and datetime.fromisoformat(e["end"]) >= day_start
+    ]
+    events.sort(key=lambda e: e["start"])
+
+    def local(value):
+        return datetime.fromisoformat(value).astimezone(tz).strftime("%H:%M")
+
+    return {
+        "date": day.isoformat(),
+        "events": [
+            {
+                "title": e["title"],
+                "start": "all day" if e["allDay"] else local(e["start"]),
+                "end": None if e["allDay"] else local(e["end"]),
+                **({"category": e["category"]} if e["category"] else {}),
+            }
+            for e in events
+        ],
+    }
+
+
+async def _goal_progress(db, user_id: int, tz, query: str | None = None):
+    stmt = select(Goal).where(Goal.user_id == user_id, Goal.status == "active")
+    if query:
+        stmt = stmt.where(Goal.title.ilike(f"%{query}%"))
+    result = await db.execute(stmt.order_by(Goal.created_at))
+    return [
+        {
+            "title": g.title,
+            "progress": g.progress,
+            "target": g.target_date.date().isoformat() if g.target_date else None,
+            "milestones": [
+                {"title": m.title, "done": m.is_completed} for m in g.milestones
+            ],
+        }
+        for g in result.scalars().all()
+    ]
+
+
+async def _habit_streaks(db, user_id: int, tz):
+    streaks = await habit_streaks(db, user_id, datetime.now(tz).date())
+    result = await db.execute(
+        select(CustomHabit.id, CustomHabit.name).where(
+            CustomHabit.user_id == user_id, CustomHabit.is_active == True
+        )
+    )
+    names = {f"custom_{habit_id}": name for habit_id, name in result.all()}
+    return {names.get(key, key.replace("_", " ")): days for key, days in streaks.items()}
+
+
+async def _search_notes(db, user_id: int, tz, query: str = ""):
+    passages = await relevant_passages(user_id, query)
+    if passages:
+        return passages
+
+    # The index is still being built; fall back to a plain title/content match
+    result = await db.execute(
+        select(Note)
+        .where(
+            Note.user_id == user_id,
+            or_(Note.title.ilike(f"%{query}%"), Note.content.ilike(f"%{query}%")),
+        )
+        .order_by(Note.updated_at.desc())
+        .limit(5)
+    )
+    return [f'Note "{n.title}": {_strip_html(n.content)[:300]}' for n in result.scalars().all()]
+
+
+_EXECUTORS = {
+    "list_events": _list_events,
+    "get_goal_progress": _goal_progress,
+    "get_habit_streaks": _habit_streaks,
+    "search_notes": _search_notes,
+}
+
+
+async def run_tool(user_id: int, tz, name: str, arguments: dict) -> str:
+    """Run one tool call and return its result as compact JSON for the model."""
+    executor = _EXECUTORS.get(name)
+    if executor is None:
+        return json.dumps({"error": f"Unknown tool {name}"})
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await executor(db, user_id, tz, **(arguments or {}))
+    except (TypeError, ValueError) as e:
+        return json.dumps({"error": f"Bad arguments for {name}: {e}"})
+    except Exception:
+        logger.exception("Chat tool %s failed for user %s", name, user_id)
+        return json.dumps({"error": f"{name} failed"})
+    return json.dumps(result, separators=(",", ":"), default=str)
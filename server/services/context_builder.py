@@ -1,15 +1,19 @@
+import asyncio
 import re
 from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from server.config import settings
+from server.database import AsyncSessionLocal
 from server.models.calendar_event import CalendarEvent
 from server.models.goal import Goal
 from server.models.note import Note
 from server.models.journal import JournalEntry
 from server.models.habit import HabitLog, CustomHabit, CustomHabitLog
 from server.models.focus import FocusSession
+from server.services import context_cache
 
 
 def _strip_html(text):
@@ -18,26 +22,12 @@ def _strip_html(text):
     return re.sub(r"<[^>]+>", "", text).strip()
 
 
-async def build_context(db: AsyncSession, user_id: int) -> str:
-    now = datetime.now(timezone.utc)
-    today = now.date()
-    week_ahead = now + timedelta(days=7)
-
-    parts = [
-        "You are a personal productivity assistant embedded in the user's productivity hub. "
-        "You have access to their goals, journal entries, habits, calendar, and notes. "
-        "Use this data naturally to give relevant, thoughtful responses — reference specifics "
-        "when helpful, offer encouragement, suggest connections between their goals and activities, "
-        "and help them stay on track. Never just dump their data back at them. "
-        "Be warm, concise, and practical. Today is "
-        + now.strftime("%A, %B %d, %Y") + "."
-    ]
-
-    # Active goals
+async def _goals_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
     result = await db.execute(
         select(Goal).where(Goal.user_id == user_id, Goal.status == "active")
     )
     goals = result.scalars().all()
+    parts = []
     if goals:
         parts.append("\n[Active Goals]")
         for g in goals:
@@ -46,7 +36,10 @@ async def build_context(db: AsyncSession, user_id: int) -> str:
                 parts.append(f"{line} — target: {g.target_date}")
             else:
                 parts.append(line)
+    return parts
 
+
+async def _journal_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
     # Last 5 journal entries
     result = await db.execute(
         select(JournalEntry)
@@ -55,20 +48,24 @@ async def build_context(db: AsyncSession, user_id: int) -> str:
         .limit(5)
     )
     journals = result.scalars().all()
-    if journals:
-        has_content = [j for j in journals if j.morning_intentions or j.content or j.evening_reflection]
-        if has_content:
-            parts.append("\n[Recent Journal Entries]")
-            for j in has_content:
-                parts.append(f"— {j.date.strftime('%a %b %d')}:")
-                if j.morning_intentions:
-                    parts.append(f"  Intentions: {_strip_html(j.morning_intentions)[:150]}")
-                if j.content:
-                    parts.append(f"  Notes: {_strip_html(j.content)[:150]}")
-                if j.evening_reflection:
-                    parts.append(f"  Reflection: {_strip_html(j.evening_reflection)[:150]}")
-
-    # Today's habit logs
+    parts = []
+    has_content = [j for j in journals if j.morning_intentions or j.content or j.evening_reflection]
+    if has_content:
+        parts.append("\n[Recent Journal Entries]")
+        for j in has_content:
+            parts.append(f"— {j.date.strftime('%a %b %d')}:")
+            if j.morning_intentions:
+                parts.append(f"  Intentions: {_strip_html(j.morning_intentions)[:150]}")
+            if j.content:
+                parts.append(f"  Notes: {_strip_html(j.content)[:150]}")
+            if j.evening_reflection:
+                parts.append(f"  Reflection: {_strip_html(j.evening_reflection)[:150]}")
+    return parts
+
+
+async def _habits_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
+    today = now.date()
+
     result = await db.execute(
         select(HabitLog).where(HabitLog.user_id == user_id, HabitLog.date == today)
     )
@@ -117,29 +114,35 @@ async def build_context(db: AsyncSession, user_id: int) -> str:
             elif habit.tracking_type == "rating":
                 habit_parts.append(f"- {habit.name}: {cl.value}/5")
 
-    if habit_parts:
-        parts.append("\n[Today's Habits]")
-        parts.extend(habit_parts)
+    if not habit_parts:
+        return []
+    return ["\n[Today's Habits]", *habit_parts]
+
 
+async def _events_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
     # Upcoming events (next 7 days)
     result = await db.execute(
         select(CalendarEvent)
         .where(
             CalendarEvent.user_id == user_id,
             CalendarEvent.start >= now,
-            CalendarEvent.start <= week_ahead,
+            CalendarEvent.start <= now + timedelta(days=7),
         )
         .order_by(CalendarEvent.start)
         .limit(10)
     )
     events = result.scalars().all()
+    parts = []
     if events:
         parts.append("\n[Upcoming Events]")
         for e in events:
             parts.append(
                 f"- {e.title} on {e.start.strftime('%a %b %d at %I:%M %p')}"
             )
+    return parts
 
+
+async def _notes_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
     # Recent notes (titles + plain-text previews)
     result = await db.execute(
         select(Note)
@@ -148,13 +151,16 @@ async def build_context(db: AsyncSession, user_id: int) -> str:
         .limit(5)
     )
     notes = result.scalars().all()
+    parts = []
     if notes:
         parts.append("\n[Recent Notes]")
         for n in notes:
             preview = _strip_html(n.content)[:120]
             parts.append(f"- {n.title}: {preview}")
+    return parts
+
 
-    # Recent focus sessions
+async def _focus_section(db: AsyncSession, user_id: int, now: datetime) -> list[str]:
     result = await db.execute(
         select(FocusSession)
         .where(FocusSession.user_id == user_id)
@@ -162,11 +168,84 @@ async def build_context(db: AsyncSession, user_id: int) -> str:
         .limit(5)
     )
     focus_sessions = result.scalars().all()
+    parts = []
     if focus_sessions:
         parts.append("\n[Recent Focus Sessions]")
         for fs in focus_sessions:
             title = fs.title or "Untitled"
             duration_min = (fs.actual_duration or 0) // 60
             parts.append(f"- {title}: {duration_min}min ({fs.status})")
+    return parts
+
+
+# Order in which sections appear in the prompt; names match context_cache.SECTION_NAMES.
+# Sections that change least often come first so consecutive prompts share the
+# longest possible prefix and Ollama can reuse its KV cache for it.
+SECTIONS = (
+    ("goals", _goals_section),
+    ("notes", _notes_section),
+    ("journal", _journal_section),
+    ("focus", _focus_section),
+    ("habits", _habits_section),
+    ("events", _events_section),
+)
+
+INSTRUCTIONS = (
+    "You are a personal productivity assistant embedded in the user's productivity hub. "
+    "You have access to their goals, journal entries, habits, calendar, and notes. "
+    "Use this data naturally to give relevant, thoughtful responses — reference specifics "
+    "when helpful, offer encouragement, suggest connections between their goals and activities, "
+    "and help them stay on track. Never just dump their data back at them. "
+    "Be warm, concise, and practical."
+)
+
+
+# Caps how many pooled connections context rebuilds may hold at once (process-wide)
+_query_slots = asyncio.Semaphore(settings.CONTEXT_QUERY_CONCURRENCY)
+
+
+async def _build_on_own_session(builder, user_id: int, now: datetime) -> str:
+    async with _query_slots:
+        async with AsyncSessionLocal() as db:
+            return "\n".join(await builder(db, user_id, now))
+
+
+async def build_sections(db: AsyncSession, user_id: int, now: datetime, names) -> dict[str, str]:
+    """Build the named sections, in parallel when there is more than one.
+
+    A lone section runs on the caller's session. Several sections each get their
+    own short-lived session so their queries overlap instead of queueing on one
+    connection; results come back keyed by name and are assembled in SECTIONS order.
+    """
+    builders = dict(SECTIONS)
+    if len(names) == 1:
+        name = names[0]
+        return {name: "\n".join(await builders[name](db, user_id, now))}
+
+    texts = await asyncio.gather(
+        *(_build_on_own_session(builders[name], user_id, now) for name in names)
+    )
+    return dict(zip(names, texts))
+
+
+async def build_context(db: AsyncSession, user_id: int) -> str:
+    now = datetime.now(timezone.utc)
+
+    # Static instructions first, then sections from slow- to fast-changing, date last
+    parts = [INSTRUCTIONS]
+
+    texts = {name: context_cache.get_section(user_id, name) for name, _ in SECTIONS}
+    missing = [name for name, text in texts.items() if text is None]
+    if missing:
+        generations = {name: context_cache.generation(user_id, name) for name in missing}
+        built = await build_sections(db, user_id, now, missing)
+        for name, text in built.items():
+            context_cache.store_section(user_id, name, text, generations[name])
+        texts.update(built)
+
+    for name, _ in SECTIONS:
+        if texts[name]:
+            parts.append(texts[name])
 
+    parts.append("\nToday is " + now.strftime("%A, %B %d, %Y") + ".")
     return "\n".join(parts)
@@ -0,0 +1,119 @@
+"""
+Process-local cache of the chat system context, stored per user and per section.
+
+build_context() reads each section from here and only rebuilds the ones that are
+missing or stale. A section goes stale when:
+
+- a router that writes the underlying data calls invalidate_context() and the
+  request's transaction commits,
+- the UTC day changes (habits and events are relative to "today"),
+- it is older than CONTEXT_CACHE_TTL_SECONDS (upcoming events move with the clock).
+
+The cache lives in one worker process; other workers pick up changes via the TTL.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.config import settings
+
+SECTION_NAMES = ("goals", "notes", "journal", "focus", "habits", "events")
+
+class _UserSections:
+    """One user's cached sections, and how often each was dropped."""
+
+    def __init__(self):
+        self.sections: dict[str, tuple] = {}  # section -> (text, built_at monotonic, utc date)
+        self.generations: dict[str, int] = {}
+
+
+# user_id -> cached sections, least recently used first. Generations live and are
+# evicted with the sections they guard, so nothing here outgrows CONTEXT_CACHE_MAX_USERS.
+_cache: OrderedDict[int, _UserSections] = OrderedDict()
+
+
+def get_section(user_id: int, section: str) -> str | None:
+    """Return the cached text for a section, or None if it must be rebuilt."""
+    entry = _cache.get(user_id)
+    if entry is None or section not in entry.sections:
+        return None
+    _cache.move_to_end(user_id)
+
+    text, built_at, day = entry.sections[section]
+    if day != datetime.now(timezone.utc).date():
+        return None
+    if time.monotonic() - built_at > settings.CONTEXT_CACHE_TTL_SECONDS:
+        return None
+    return text
+
+
+def _entry(user_id: int) -> _UserSections:
+    entry = _cache.get(user_id)
+    if entry is None:
+        entry = _cache[user_id] = _UserSections()
+    _cache.move_to_end(user_id)
+    while len(_cache) > settings.CONTEXT_CACHE_MAX_USERS:
+        _cache.popitem(last=False)
+    return entry
+
+
+def generation(user_id: int, section: str) -> tuple:
+    """Snapshot to pass to store_section, taken before building the section."""
+    entry = _entry(user_id)
+    return entry, entry.generations.get(section, 0)
+
+
+def store_section(user_id: int, section: str, text: str, built_from: tuple):
+    """Cache a built section, unless it was dropped since the build started.
+
+    A write that commits while the build is still querying may not be in
+    the text, so storing it would keep stale data for the whole TTL. If the
+    user's entry was evicted or dropped meanwhile, built_from names an entry
+    that is no longer cached, and the text is discarded as well.
+    """
+    entry, built_generation = built_from
+    if _cache.get(user_id) is not entry or entry.generations.get(section, 0) != built_generation:
+        return
+    entry.sections[section] = (text, time.monotonic(), datetime.now(timezone.utc).date())
+    _cache.move_to_end(user_id)
+
+
+def drop_sections(user_id: int, *sections: str):
+    """Immediately forget sections for a user (all of them if none are given)."""
+    entry = _cache.get(user_id)
+    if entry is None:
+        return  # nothing cached, and no build in flight that could store
+    if not sections:
+        del _cache[user_id]
+        return
+    for section in sections:
+        entry.sections.pop(section, None)
+        entry.generations[section] = entry.generations.get(section, 0) + 1
+
+
+def invalidate_context(db: AsyncSession, user_id: int, *sections: str):
+    """Mark sections stale once the current transaction on db commits.
+
+    Dropping at commit, rather than at flush, means a chat request that runs
+    between the two rebuilds after the commit instead of reusing a pre-write
+    section. A rebuild already in flight at commit is discarded by
+    store_section's generation check.
+    """
+    pending = db.sync_session.info.setdefault("stale_context", set())
+    pending.update((user_id, s) for s in sections or SECTION_NAMES)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session):
+    for user_id, section in session.info.pop("stale_context", ()):
+        drop_sections(user_id, section)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop("stale_context", None)
@@ -0,0 +1,424 @@
+"""
+Local retrieval index over each user's notes, journal entries and thought posts.
+
+Documents are split into passages of about RAG_PASSAGE_CHARS characters and
+embedded on the CPU with torch as signed, hashed unigram and bigram features
+(sublinear term frequency, L2-normalised). That needs no model download, and a
+passage's vector depends only on its own text, so documents can be re-embedded
+one at a time. Vectors live in one memory-mapped float32 file per user under
+EMBEDDING_INDEX_DIR, beside a JSON file that describes each row. Every worker
+process maps the same files; a file lock orders their reads and writes.
+
+Routers call index_document()/unindex_document() next to their writes, and the
+index is updated in a worker thread once the transaction commits. A user's index
+is built from the database in the background the first time they chat.
+
+Memories distilled from past chat sessions (see chat_memory) live in a second,
+separate index per user so they don't compete with documents for the top slots.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from server.config import settings
+from server.database import AsyncSessionLocal
+from server.models.chat_message import ChatMemory
+from server.models.journal import JournalEntry
+from server.models.note import Note
+from server.models.thought import ThoughtPost
+from server.services.context_builder import _strip_html
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker process, nothing to coordinate
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a about am an and any are as at be but by can could did do does for from get "
+    "going had has have how i if in is it its me my of on or our should so that "
+    "the their them there this to was we were what when where which who why will "
+    "with would you your".split()
+)
+
+DOCUMENTS = ""
+MEMORIES = "memories"
+# Which index each kind of document goes in, and which models each index is built from
+_INDEX_FOR_KIND = {"note": DOCUMENTS, "journal": DOCUMENTS, "thought": DOCUMENTS, "memory": MEMORIES}
+_SOURCES = {DOCUMENTS: (Note, JournalEntry, ThoughtPost), MEMORIES: (ChatMemory,)}
+
+# Open (user_id, index name) indexes, least recently used first
+_indexes: OrderedDict[tuple[int, str], "_UserIndex"] = OrderedDict()
+_MAX_OPEN_INDEXES = 128
+_user_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+_builds: set[tuple[int, str]] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+def _features(text: str) -> list[tuple[str, float]]:
+    words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+    # Bigrams reward matching phrases without drowning out single-word matches
+    return [(w, 1.0) for w in words] + [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+
+
+def embed(texts: list[str]) -> np.ndarray:
+    """Embed texts as rows of an (n, EMBEDDING_DIM) float32 array of unit vectors."""
+    import torch  # heavy import, only paid once something is indexed or searched
+
+    dim = settings.EMBEDDING_DIM
+    rows, cols, weights = [], [], []
+    for i, text in enumerate(texts):
+        for feature, weight in _features(text):
+            h = zlib.crc32(feature.encode())
+            rows.append(i)
+            cols.append(h % dim)
+            weights.append(weight if h & 0x80000000 else -weight)
+
+    vectors = torch.zeros(len(texts), dim)
+    if rows:
+        vectors.index_put_(
+            (torch.tensor(rows), torch.tensor(cols)), torch.tensor(weights), accumulate=True
+        )
+    vectors = torch.sign(vectors) * torch.log1p(vectors.abs())
+    return torch.nn.functional.normalize(vectors, dim=1).numpy()
+
+
+def _passages(text: str) -> list[str]:
+    text = " ".join(text.split())
+    size = settings.RAG_PASSAGE_CHARS
+    passages = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut > 0:
+                end = cut
+        passages.append(text[start:end].strip())
+        start = end
+    return [p for p in passages if p]
+
+
+def _document(doc) -> tuple[str, int, list[str]]:
+    """Return (kind, id, passages) for an indexed model instance."""
+    if isinstance(doc, Note):
+        kind, label = "note", f'Note "{doc.title}"'
+        text = f"{doc.title}. {_strip_html(doc.content)} {doc.tags or ''}"
+    elif isinstance(doc, JournalEntry):
+        kind, label = "journal", f"Journal {doc.date.isoformat()}"
+        text = " ".join(
+            _strip_html(part)
+            for part in (doc.morning_intentions, doc.content, doc.evening_reflection)
+            if part
+        )
+    elif isinstance(doc, ThoughtPost):
+        kind, label = "thought", f'Thought "{doc.title}"'
+        text = f"{doc.title}. {_strip_html(doc.body)} {doc.tags or ''}"
+    elif isinstance(doc, ChatMemory):
+        # Memories are already one short fact each
+        return "memory", doc.id, [f"({doc.created_at:%b %d}) {doc.content}"]
+    else:
+        raise TypeError(f"Cannot index {type(doc).__name__}")
+    return kind, doc.id, [f"{label}: {p}" for p in _passages(text)]
+
+
+class _UserIndex:
+    """Vectors for one user in a memory-mapped file; rows[i] describes vectors[i].
+
+    All worker processes share the files. Writers hold an exclusive flock on the
+    index's lock file and readers a shared one, and each process reloads
+    rows.json (remapping the vectors) whenever another one has replaced it.
+    """
+
+    def __init__(self, user_id: int, name: str = DOCUMENTS):
+        self.dir = Path(settings.EMBEDDING_INDEX_DIR) / str(user_id) / name
+        self.lock = threading.Lock()
+        self.rows: list = []  # [kind, doc_id, text], or None for a free slot
+        self.vectors = None
+        self.exists = False
+        self._loaded = None  # (inode, mtime) of the rows.json in memory
+        with self.lock, self._file_lock(exclusive=False):
+            self._reload()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / "lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield  # closing the file releases the lock
+
+    def _reload(self):
+        meta = self.dir / "rows.json"
+        try:
+            stat = meta.stat()
+        except FileNotFoundError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns) == self._loaded:
+            return
+        data = json.loads(meta.read_text())
+        self._loaded = (stat.st_ino, stat.st_mtime_ns)
+        # Vectors from a different EMBEDDING_DIM are unusable; rebuild instead
+        if data["dim"] == settings.EMBEDDING_DIM:
+            self.rows = data["rows"]
+            self._map(data["capacity"])
+            self.exists = True
+
+    def _map(self, capacity: int, path: Path | None = None):
+        path = path or self.dir / "vectors.f32"
+        size = capacity * settings.EMBEDDING_DIM * 4
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.vectors = np.memmap(
+            path, dtype=np.float32, mode="r+", shape=(capacity, settings.EMBEDDING_DIM)
+        )
+
+    def _save(self):
+        self.vectors.flush()
+        tmp = self.dir / "rows.json.tmp"
+        tmp.write_text(json.dumps({
+            "dim": settings.EMBEDDING_DIM,
+            "capacity": len(self.vectors),
+            "rows": self.rows,
+        }))
+        os.replace(tmp, self.dir / "rows.json")
+        stat = (self.dir / "rows.json").stat()
+        self._loaded = (stat.st_ino, stat.st_mtime_ns)
+        self.exists = True
+
+    def ready(self) -> bool:
+        """True once the index has been built, by this process or another."""
+        if not self.exists:
+            with self.lock, self._file_lock(exclusive=False):
+                self._reload()
+        return self.exists
+
+    def reset(self, rows: list, vectors: np.ndarray):
+        with self.lock, self._file_lock(exclusive=True):
+            self.dir.mkdir(parents=True, exist_ok=True)
+            # Fill a new file: other processes may still have the old one mapped
+            tmp = self.dir / "vectors.f32.tmp"
+            tmp.unlink(missing_ok=True)
+            self.rows = []
+            self._map(max(64, len(rows)), tmp)
+            self._write(rows, vectors)
+            self.vectors.flush()
+            os.replace(tmp, self.dir / "vectors.f32")
+            self._save()
+
+    def update(self, remove: set, rows: list, vectors: np.ndarray):
+        """Drop every row of the (kind, doc_id) pairs in remove, then add rows."""
+        with self.lock, self._file_lock(exclusive=True):
+            self._reload()
+            for i, row in enumerate(self.rows):
+                if row is not None and (row[0], row[1]) in remove:
+                    self.rows[i] = None
+                    self.vectors[i] = 0
+            self._write(rows, vectors)
+            self._save()
+
+    def _write(self, rows: list, vectors: np.ndarray):
+        free = [i for i, row in enumerate(self.rows) if row is None]
+        for row, vector in zip(rows, vectors):
+            if free:
+                i = free.pop(0)
+                self.rows[i] = row
+            else:
+                i = len(self.rows)
+                if i == len(self.vectors):
+                    self._map(len(self.vectors) * 2)
+                self.rows.append(row)
+            self.vectors[i] = vector
+
+    def search(self, query: np.ndarray, k: int, min_score: float) -> list[str]:
+        with self.lock, self._file_lock(exclusive=False):
+            self._reload()
+            n = len(self.rows)
+            if not n:
+                return []
+            scores = np.asarray(self.vectors[:n] @ query)
+            top = np.argpartition(-scores, k)[:k] if n > k else np.arange(n)
+            top = top[np.argsort(-scores[top])]
+            return [
+                self.rows[i][2] for i in top
+                if self.rows[i] is not None and scores[i] >= min_score
+            ]
+
+
+def _get_index(user_id: int, name: str = DOCUMENTS) -> _UserIndex:
+    key = (user_id, name)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = _UserIndex(user_id, name)
+        while len(_indexes) > _MAX_OPEN_INDEXES:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(key)
+    return index
+
+
+def _user_lock(user_id: int) -> asyncio.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+    return lock
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def index_document(db: AsyncSession, user_id: int, doc):
+    """(Re)index a Note, JournalEntry, ThoughtPost or ChatMemory once db's transaction commits."""
+    db.sync_session.info.setdefault("embedding_updates", []).append((user_id, doc, None))
+
+
+def unindex_document(db: AsyncSession, user_id: int, kind: str, doc_id: int):
+    """Remove a document ("note", "journal", "thought" or "memory") once db's transaction commits."""
+    db.sync_session.info.setdefault("embedding_updates", []).append(
+        (user_id, None, (kind, doc_id))
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_updates(session):
+    updates = session.info.pop("embedding_updates", None)
+    if not updates:
+        return
+
+    by_index: dict[tuple[int, str], tuple[set, dict]] = {}
+    for user_id, doc, removed in updates:
+        if doc is not None:
+            kind, doc_id, passages = _document(doc)
+        else:
+            (kind, doc_id), passages = removed, None
+        remove, add = by_index.setdefault((user_id, _INDEX_FOR_KIND[kind]), (set(), {}))
+        remove.add((kind, doc_id))
+        if passages is not None:
+            add[(kind, doc_id)] = passages
+        else:
+            add.pop((kind, doc_id), None)
+
+    for (user_id, name), (remove, add) in by_index.items():
+        rows = [[kind, doc_id, text] for (kind, doc_id), texts in add.items() for text in texts]
+        try:
+            _spawn(_apply_updates(user_id, name, remove, rows))
+        except RuntimeError:
+            # No running loop (scripts); the index catches up on its next rebuild
+            pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_updates(session):
+    session.info.pop("embedding_updates", None)
+
+
+async def _apply_updates(user_id: int, name: str, remove: set, rows: list):
+    try:
+        async with _user_lock(user_id):
+            index = _get_index(user_id, name)
+            if not await asyncio.to_thread(index.ready):
+                return  # the first build reads everything from the database
+            vectors = await asyncio.to_thread(embed, [r[2] for r in rows])
+            await asyncio.to_thread(index.update, remove, rows, vectors)
+    except Exception:
+        logger.exception("Failed to update embedding index for user %s", user_id)
+
+
+async def _build(user_id: int, name: str):
+    try:
+        async with _user_lock(user_id):
+            index = _get_index(user_id, name)
+            if await asyncio.to_thread(index.ready):
+                return
+            async with AsyncSessionLocal() as db:
+                docs = []
+                for model in _SOURCES[name]:
+                    result = await db.execute(select(model).where(model.user_id == user_id))
+                    docs.extend(result.scalars().all())
+
+            rows = []
+            for doc in docs:
+                kind, doc_id, passages = _document(doc)
+                rows.extend([kind, doc_id, text] for text in passages)
+            vectors = await asyncio.to_thread(embed, [r[2] for r in rows])
+            await asyncio.to_thread(index.reset, rows, vectors)
+            logger.info(
+                "Built %s index for user %s (%d passages)", name or "document", user_id, len(rows)
+            )
+    except Exception:
+        logger.exception("Failed to build %s index for user %s", name or "document", user_id)
+    finally:
+        _builds.discard((user_id, name))
+
+
+def ensure_index(user_id: int, name: str = DOCUMENTS) -> bool:
+    """True if the user's index is ready; otherwise start building it in the background."""
+    if _get_index(user_id, name).ready():
+        return True
+    if (user_id, name) not in _builds:
+        _builds.add((user_id, name))
+        _spawn(_build(user_id, name))
+    return False
+
+
+async def _search(user_id: int, name: str, query: str, k: int, min_score: float) -> list[str]:
+    if k <= 0 or not ensure_index(user_id, name):
+        return []
+    index = _get_index(user_id, name)
+    vector = (await asyncio.to_thread(embed, [query]))[0]
+    return await asyncio.to_thread(index.search, vector, k, min_score)
+
+
+async def relevant_passages(user_id: int, query: str) -> list[str]:
+    """Top RAG_TOP_K passages for query, best first; empty until the index is built."""
+    return await _search(user_id, DOCUMENTS, query, settings.RAG_TOP_K, settings.RAG_MIN_SCORE)
+
+
+async def relevant_memories(user_id: int, query: str) -> list[str]:
+    """Top CHAT_MEMORY_TOP_K memories from earlier sessions for query, best first."""
+    return await _search(
+        user_id, MEMORIES, query, settings.CHAT_MEMORY_TOP_K, settings.CHAT_MEMORY_MIN_SCORE
+    )
+
+
+def with_passages(messages: list[dict], passages: list[str], memories=()) -> list[dict]:
+    """Insert retrieved passages and memories just before the newest message.
+
+    They go after the history rather than into the system prompt so the
+    prompt's cacheable prefix stays the same from turn to turn.
+    """
+    parts = []
+    if passages:
+        parts.append(
+            "Entries from the user's notes, journal and thoughts that may be relevant:\n"
+            + "\n".join(f"- {p}" for p in passages)
+        )
+    if memories:
+        parts.append(
+            "From earlier conversations with the user:\n" + "\n".join(f"- {m}" for m in memories)
+        )
+    if not parts:
+        return messages
+    return messages[:-1] + [{"role": "system", "content": "\n\n".join(parts)}] + messages[-1:]
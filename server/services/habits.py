@@ -0,0 +1,67 @@
+"""
+Habit rules shared by the habits routes and the chat features: the preset
+categories, and streaks computed the same way everywhere.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from server.models.habit import HabitLog, CustomHabit, CustomHabitLog
+
+HABIT_CATEGORIES = ["sleep", "fitness", "finance", "diet_health"]
+STREAK_MAX_DAYS = 90
+
+
+def _custom_done(habit: CustomHabit, value: str) -> bool:
+    if not value:
+        return False
+    if habit.tracking_type == "checkbox":
+        return value == "true"
+    try:
+        return float(value) > 0
+    except (ValueError, TypeError):
+        return False
+
+
+def _streak(done_days: set, today: date) -> int:
+    streak = 0
+    while streak < STREAK_MAX_DAYS and today - timedelta(days=streak) in done_days:
+        streak += 1
+    return streak
+
+
+async def habit_streaks(db, user_id: int, today: date) -> dict[str, int]:
+    """Streaks keyed like /habits/week ("sleep", "custom_<id>"), in three queries.
+
+    Same rule as the habits page: consecutive completed days ending today,
+    looking back at most STREAK_MAX_DAYS.
+    """
+    since = today - timedelta(days=STREAK_MAX_DAYS - 1)
+    result = await db.execute(
+        select(HabitLog).where(HabitLog.user_id == user_id, HabitLog.date >= since)
+    )
+    preset_days = {cat: set() for cat in HABIT_CATEGORIES}
+    for log in result.scalars().all():
+        if log.category in preset_days and log.is_completed:
+            preset_days[log.category].add(log.date)
+
+    result = await db.execute(
+        select(CustomHabit).where(CustomHabit.user_id == user_id, CustomHabit.is_active == True)
+    )
+    habits = {h.id: h for h in result.scalars().all()}
+    result = await db.execute(
+        select(CustomHabitLog).where(
+            CustomHabitLog.user_id == user_id, CustomHabitLog.date >= since
+        )
+    )
+    custom_days = {habit_id: set() for habit_id in habits}
+    for log in result.scalars().all():
+        habit = habits.get(log.custom_habit_id)
+        if habit and _custom_done(habit, log.value):
+            custom_days[habit.id].add(log.date)
+
+    streaks = {cat: _streak(days, today) for cat, days in preset_days.items()}
+    for habit_id, days in custom_days.items():
+        streaks[f"custom_{habit_id}"] = _streak(days, today)
+    return streaks
@@ -0,0 +1,290 @@
+"""
+Answers plain data lookups ("what's on today?", "my sleep streak?") without the LLM.
+
+A Naive Bayes classifier over nltk wordpunct tokens, trained at first use on the
+examples below, sorts each message into one of INTENTS or "other". Short
+messages classified with at least INTENT_MIN_CONFIDENCE, whose words all appear
+in that intent's examples, get a templated reply built from the same queries
+the chat tools use; everything else goes to Ollama.
+
+The one exception to the vocabulary rule is the habit named in a streak
+question ("my reading streak"). Naive Bayes gives a word it never saw no
+weight, so the probability can't tell "my meditation streak" from "my losing
+streak"; the reply is only templated if the word names one of the user's habits.
+"""
+
+import logging
+from datetime import datetime, timedelta, time
+
+from nltk.classify import NaiveBayesClassifier
+from nltk.tokenize import wordpunct_tokenize
+from sqlalchemy import select, func
+
+from server.config import settings
+from server.models.focus import FocusSession
+from server.models.habit import CustomHabit
+from server.services.chat_tools import _list_events
+from server.services.habits import HABIT_CATEGORIES, habit_streaks
+
+logger = logging.getLogger(__name__)
+
+# Longer messages are conversation even when they mention the calendar or a habit
+MAX_TOKENS = 12
+# Naive Bayes ignores words it never saw, so "what's the weather today" would
+# look like a calendar question. Every other word must appear in the intent's
+# examples, which also sends "tomorrow"/"last week" variants to the LLM.
+_FILLER = frozenset("a am any are do for have how i in is me my of on s the to what".split())
+
+_EXAMPLES = {
+    "events_today": [
+        "what's on my calendar today",
+        "what is on my calendar today",
+        "what do i have today",
+        "what's on today",
+        "any events today",
+        "do i have any meetings today",
+        "what's my schedule today",
+        "show me today's schedule",
+        "today's events",
+        "what's on my schedule",
+        "what is happening today",
+        "am i busy today",
+        "list my events for today",
+        "anything on the calendar today",
+        "what appointments do i have today",
+        "my agenda for today",
+    ],
+    "focus_week": [
+        "how many focus minutes this week",
+        "how much did i focus this week",
+        "focus time this week",
+        "how long have i focused this week",
+        "my focus minutes this week",
+        "how many focus sessions this week",
+        "weekly focus total",
+        "total focus time this week",
+        "how much deep work this week",
+        "focus stats for this week",
+        "how many minutes did i focus this week",
+        "what's my focus time so far this week",
+    ],
+    "habit_streak": [
+        "what's my sleep streak",
+        "what is my streak",
+        "how long is my streak",
+        "my habit streaks",
+        "what are my streaks",
+        "how many days in a row have i exercised",
+        "current fitness streak",
+        "show my habit streaks",
+        "how's my streak going",
+        "what's my reading streak",
+        "streak for water",
+        "how many days straight",
+        "am i on a streak",
+        "what's my current streak",
+    ],
+    "other": [
+        "hi",
+        "hello there",
+        "thanks",
+        "how are you",
+        "help me plan my week",
+        "add a meeting to my calendar tomorrow",
+        "schedule a dentist appointment",
+        "how can i focus better",
+        "tips to stay focused while working",
+        "why do i keep breaking my streak",
+        "how do i build a habit",
+        "i broke my streak yesterday and feel bad",
+        "what should i work on next",
+        "summarize my goals",
+        "write a journal prompt for tonight",
+        "can you help me prioritise my tasks",
+        "what did i write in my notes about marathon training",
+        "i feel tired today",
+        "suggest a morning routine",
+        "how was my week",
+        "give me motivation",
+        "what is a good sleep schedule",
+        "should i move my meeting",
+        "explain the pomodoro technique",
+        "plan my day around my calendar",
+        "i want to start a new habit",
+        "tell me a joke",
+        "what can you do",
+        "what's on my calendar tomorrow",
+        "what do i have tomorrow",
+        "what did i do yesterday",
+        "what's on next week",
+        "add lunch to my calendar today",
+        "move my meeting today to friday",
+        "cancel my events today",
+        "what's the weather today",
+        "i have a lot on today any tips",
+        "how do i keep a streak going when i travel",
+        "what's my losing streak",
+        "i'm on a winning streak",
+        "what was my longest streak",
+        "how much did i focus last week",
+        "what should i do today",
+        "help me focus today",
+        "what's new",
+    ],
+}
+INTENTS = [name for name in _EXAMPLES if name != "other"]
+
+# Words that name a preset habit category in a question
+_PRESET_WORDS = {
+    "sleep": "sleep",
+    "fitness": "fitness",
+    "exercise": "fitness",
+    "exercised": "fitness",
+    "workout": "fitness",
+    "finance": "finance",
+    "spending": "finance",
+    "budget": "finance",
+    "diet": "diet_health",
+    "water": "diet_health",
+    "health": "diet_health",
+}
+
+_classifier: NaiveBayesClassifier | None = None
+_vocab: dict[str, set[str]] = {}
+
+
+def _tokens(text: str) -> list[str]:
+    return [t for t in wordpunct_tokenize(text.lower()) if t.isalnum()]
+
+
+def _features(tokens: list[str]) -> dict:
+    features = {f"w:{t}": True for t in tokens}
+    features.update({f"b:{a} {b}": True for a, b in zip(tokens, tokens[1:])})
+    return features
+
+
+def _get_classifier() -> NaiveBayesClassifier:
+    global _classifier
+    if _classifier is None:
+        for intent, texts in _EXAMPLES.items():
+            _vocab[intent] = {t for text in texts for t in _tokens(text)}
+        _classifier = NaiveBayesClassifier.train(
+            [(_features(_tokens(text)), intent) for intent, texts in _EXAMPLES.items() for text in texts]
+        )
+    return _classifier
+
+
+def classify(text: str) -> tuple[str, float] | None:
+    """Return (intent, probability) for a confident lookup, else None."""
+    tokens = _tokens(text)
+    if not tokens or len(tokens) > MAX_TOKENS:
+        return None
+    dist = _get_classifier().prob_classify(_features(tokens))
+    intent = dist.max()
+    prob = dist.prob(intent)
+    if intent == "other" or prob < settings.INTENT_MIN_CONFIDENCE:
+        return None
+    vocab = _vocab[intent]
+    for i, t in enumerate(tokens):
+        # The word before "streak" names the habit ("my reading streak")
+        habit_name = intent == "habit_streak" and tokens[i + 1:i + 2] in (["streak"], ["streaks"])
+        if t not in vocab and t not in _FILLER and t not in _PRESET_WORDS and not habit_name:
+            return None
+    return intent, prob
+
+
+def _plural(count: int, word: str) -> str:
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+
+async def _events_today(db, user_id: int, tz, text: str) -> str:
+    events = (await _list_events(db, user_id, tz))["events"]
+    if not events:
+        return "You have nothing on your calendar today."
+    lines = [
+        f"- {e['title']} (all day)" if e["end"] is None else f"- {e['start']}–{e['end']} {e['title']}"
+        for e in events
+    ]
+    return f"You have {_plural(len(events), 'event')} today:\n" + "\n".join(lines)
+
+
+async def _focus_week(db, user_id: int, tz, text: str) -> str:
+    today = datetime.now(tz).date()
+    week_start = datetime.combine(today - timedelta(days=today.weekday()), time.min, tzinfo=tz)
+    result = await db.execute(
+        select(
+            func.count(FocusSession.id),
+            func.coalesce(func.sum(FocusSession.actual_duration), 0),
+        ).where(FocusSession.user_id == user_id, FocusSession.created_at >= week_start)
+    )
+    sessions, seconds = result.one()
+    if not sessions:
+        return "You haven't logged any focus sessions this week yet."
+    return (
+        f"You've focused for {_plural(seconds // 60, 'minute')} this week "
+        f"across {_plural(sessions, 'session')}."
+    )
+
+
+def _named_habit(tokens: list[str]) -> str | None:
+    """The word before "streak" if the classifier's vocabulary didn't account for it."""
+    vocab = _vocab["habit_streak"]
+    for word, following in zip(tokens, tokens[1:]):
+        if following in ("streak", "streaks") and word not in vocab and word not in _FILLER:
+            return word
+    return None
+
+
+async def _habit_streak(db, user_id: int, tz, text: str) -> str | None:
+    streaks = await habit_streaks(db, user_id, datetime.now(tz).date())
+    result = await db.execute(
+        select(CustomHabit.id, CustomHabit.name).where(
+            CustomHabit.user_id == user_id, CustomHabit.is_active == True
+        )
+    )
+    names = {cat: cat.replace("_", " & ") for cat in HABIT_CATEGORIES}
+    names.update({f"custom_{habit_id}": name for habit_id, name in result.all()})
+
+    # Narrow to the habit the question names, if any
+    lowered = text.lower()
+    tokens = _tokens(text)
+    asked = {_PRESET_WORDS[t] for t in tokens if t in _PRESET_WORDS}
+    asked.update(key for key, name in names.items() if key.startswith("custom_") and name.lower() in lowered)
+    named = _named_habit(tokens)
+    if named and named not in _PRESET_WORDS and not any(
+        named in _tokens(names[key]) for key in asked if key.startswith("custom_")
+    ):
+        return None  # "my losing streak": not a habit, so let the model answer
+    if len(asked) == 1:
+        key = asked.pop()
+        days = streaks.get(key, 0)
+        if not days:
+            return f"You don't have a {names[key]} streak going right now."
+        return f"Your {names[key]} streak is {_plural(days, 'day')}."
+
+    active = [(names[key], days) for key, days in streaks.items() if days]
+    if not active:
+        return "You don't have any habit streaks going right now."
+    active.sort(key=lambda item: -item[1])
+    return "Your current streaks:\n" + "\n".join(
+        f"- {name}: {_plural(days, 'day')}" for name, days in active
+    )
+
+
+_ANSWERS = {
+    "events_today": _events_today,
+    "focus_week": _focus_week,
+    "habit_streak": _habit_streak,
+}
+
+
+async def answer_intent(db, user_id: int, tz, text: str) -> str | None:
+    """Templated reply for a confidently recognised lookup, or None to use the LLM."""
+    if not settings.INTENT_ROUTER_ENABLED:
+        return None
+    match = classify(text)
+    if match is None:
+        return None
+    intent, prob = match
+    logger.debug("Answering %r as %s (p=%.2f)", text, intent, prob)
+    return await _ANSWERS[intent](db, user_id, tz, text)
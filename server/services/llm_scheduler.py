@@ -0,0 +1,187 @@
+"""
+In-process admission control for Ollama generations.
+
+At most LLM_MAX_CONCURRENCY generations run at once. Everyone else waits in
+per-user queues that are served round-robin, so one user with several tabs open
+gets one slot per round instead of starving other users. When LLM_MAX_QUEUE_DEPTH
+requests are already waiting (or a user has LLM_MAX_QUEUED_PER_USER of their own),
+submit() raises QueueFullError and the route answers 429 with Retry-After.
+
+Usage:
+    ticket = llm_scheduler.submit(user_id)     # may raise QueueFullError
+    try:
+        async for position in ticket.positions():
+            ...                                 # report queue position
+        ...                                     # call Ollama
+    finally:
+        ticket.release()
+
+or, when queue positions aren't needed:
+    async with llm_scheduler.slot(user_id):
+        ...
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from server.config import settings
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("LLM queue is full")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, scheduler: "LLMScheduler", user_id: int):
+        self.scheduler = scheduler
+        self.user_id = user_id
+        self.granted = asyncio.Event()
+        self.granted_at: float | None = None
+        self.released = False
+
+    def position(self) -> int:
+        """1-based place in line; 0 once the ticket holds a slot."""
+        if self.granted.is_set():
+            return 0
+        return self.scheduler._position(self)
+
+    async def wait(self):
+        await self.granted.wait()
+
+    async def positions(self):
+        """Yield the queue position each time it changes, until a slot is granted."""
+        last = None
+        while not self.granted.is_set():
+            current = self.position()
+            if current != last:
+                yield current
+                last = current
+            changed = self.scheduler._changed
+            waiters = [asyncio.ensure_future(self.granted.wait()), asyncio.ensure_future(changed.wait())]
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for w in waiters:
+                    w.cancel()
+
+    def release(self):
+        """Give the slot back (or leave the queue). Safe to call more than once."""
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, max_queue_depth: int, max_queued_per_user: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.active = 0
+        # user_id -> waiting tickets; dict order is the round-robin order
+        self._queues: OrderedDict[int, deque[Ticket]] = OrderedDict()
+        self._queued = 0
+        self._changed = asyncio.Event()
+        # Moving average of how long a generation holds a slot, for Retry-After
+        self._avg_hold = 10.0
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def submit(self, user_id: int) -> Ticket:
+        ticket = Ticket(self, user_id)
+        if self.active < self.max_concurrency and not self._queued:
+            self._grant(ticket)
+            return ticket
+
+        user_queue = self._queues.get(user_id)
+        if self._queued >= self.max_queue_depth or (
+            user_queue and len(user_queue) >= self.max_queued_per_user
+        ):
+            raise QueueFullError(self.retry_after())
+
+        self._queues.setdefault(user_id, deque()).append(ticket)
+        self._queued += 1
+        self._notify()
+        return ticket
+
+    @asynccontextmanager
+    async def slot(self, user_id: int):
+        ticket = self.submit(user_id)
+        try:
+            await ticket.wait()
+            yield ticket
+        finally:
+            ticket.release()
+
+    def retry_after(self) -> int:
+        """Seconds until a queued request would likely be served."""
+        rounds = (self._queued + 1) / max(1, self.max_concurrency)
+        return max(1, min(120, math.ceil(rounds * self._avg_hold)))
+
+    def _grant(self, ticket: Ticket):
+        self.active += 1
+        ticket.granted_at = time.monotonic()
+        ticket.granted.set()
+
+    def _release(self, ticket: Ticket):
+        if ticket.granted.is_set():
+            self.active -= 1
+            held = time.monotonic() - ticket.granted_at
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        else:
+            user_queue = self._queues.get(ticket.user_id)
+            if user_queue and ticket in user_queue:
+                user_queue.remove(ticket)
+                self._queued -= 1
+                if not user_queue:
+                    del self._queues[ticket.user_id]
+        self._dispatch()
+        self._notify()
+
+    def _dispatch(self):
+        while self.active < self.max_concurrency and self._queues:
+            user_id, user_queue = next(iter(self._queues.items()))
+            ticket = user_queue.popleft()
+            self._queued -= 1
+            if user_queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            self._grant(ticket)
+
+    def _position(self, ticket: Ticket) -> int:
+        # Round-robin: the ticket at index k of its user's queue is served in
+        # round k. Ahead of it are every other user's first k tickets, plus the
+        # round-k tickets of users earlier in the rotation.
+        users = list(self._queues.items())
+        for order, (user_id, user_queue) in enumerate(users):
+            if user_id == ticket.user_id:
+                k = user_queue.index(ticket)
+                break
+        else:
+            return 0
+
+        ahead = k
+        for other_order, (user_id, user_queue) in enumerate(users):
+            if user_id == ticket.user_id:
+                continue
+            ahead += min(len(user_queue), k + (1 if other_order < order else 0))
+        return ahead + 1
+
+    def _notify(self):
+        # Wake everyone watching positions, then arm a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue_depth=settings.LLM_MAX_QUEUE_DEPTH,
+    max_queued_per_user=settings.LLM_MAX_QUEUED_PER_USER,
+)
@@ -1,82 +1,382 @@
+import asyncio
 import json
+import logging
+import time
+
 import httpx
 
 from server.config import settings
 
+logger = logging.getLogger(__name__)
+
+class Backend:
+    """One Ollama instance: its pooled client, model name and dispatch state."""
+
+    def __init__(self, url: str, model: str, weight: float = 1.0):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.weight = weight
+        self.client = _create_client(self.url)
+        self.in_flight = 0
+        self.healthy = True  # set by the health probe
+        self.ejected_until = 0.0  # monotonic time; set when a request fails
+        self.requests = 0
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def eject(self, error: Exception):
+        self.failures += 1
+        now = time.monotonic()
+        already_ejected = now < self.ejected_until
+        self.ejected_until = now + settings.OLLAMA_EJECT_SECONDS
+        if already_ejected:
+            return  # concurrent requests failing together
+        logger.warning(
+            "Ejecting Ollama backend %s for %ss: %s",
+            self.url, settings.OLLAMA_EJECT_SECONDS, error or type(error).__name__,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "model": self.model,
+            "weight": self.weight,
+            "inFlight": self.in_flight,
+            "healthy": self.healthy,
+            "ejected": time.monotonic() < self.ejected_until,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+# Backends owned by the app lifespan (see server.main). Each keeps its own
+# connection pool so connections are reused between chat turns.
+_backends: list[Backend] = []
+_health_task: asyncio.Task | None = None
+
+
+def _create_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(
+            settings.OLLAMA_READ_TIMEOUT,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def _configured_backends() -> list[Backend]:
+    """OLLAMA_BACKENDS if set, else the single OLLAMA_BASE_URL/OLLAMA_MODEL."""
+    if not settings.OLLAMA_BACKENDS:
+        return [Backend(settings.OLLAMA_BASE_URL, settings.OLLAMA_MODEL)]
+    backends = []
+    for b in json.loads(settings.OLLAMA_BACKENDS):
+        weight = float(b.get("weight", 1))
+        # Dispatch divides by the weight; leave a backend out rather than weigh it 0
+        if not weight > 0:
+            raise ValueError(f"OLLAMA_BACKENDS: weight for {b['url']} must be positive, got {weight}")
+        backends.append(Backend(b["url"], b.get("model") or settings.OLLAMA_MODEL, weight))
+    return backends
+
+
+def start_ollama_client():
+    """Create a client per configured backend and start probing their health."""
+    global _health_task
+    if not _backends:
+        _backends.extend(_configured_backends())
+    if len(_backends) > 1 and _health_task is None:
+        try:
+            _health_task = asyncio.get_running_loop().create_task(_probe_backends())
+        except RuntimeError:
+            pass  # no loop (scripts); requests still eject failing backends
+
+
+async def close_ollama_client():
+    """Stop health probes and close every backend's pooled connections."""
+    global _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    backends = list(_backends)
+    _backends.clear()
+    for backend in backends:
+        await backend.client.aclose()
 
-async def get_ollama_response(messages, system_context=""):
-    base_url = settings.OLLAMA_BASE_URL
-    model = settings.OLLAMA_MODEL
 
+def _get_backends() -> list[Backend]:
+    # Outside the app lifespan (scripts, shells) create the clients on first use
+    if not _backends:
+        start_ollama_client()
+    return _backends
+
+
+def backend_stats() -> list[dict]:
+    return [b.to_dict() for b in _backends]
+
+
+async def _probe(backend: Backend):
+    try:
+        resp = await backend.client.get("/api/tags", timeout=settings.OLLAMA_CONNECT_TIMEOUT)
+        resp.raise_for_status()
+    except Exception as e:
+        if backend.healthy:
+            logger.warning("Ollama backend %s failed its health check: %s", backend.url, e)
+        backend.healthy = False
+    else:
+        if not backend.healthy:
+            logger.info("Ollama backend %s is healthy again", backend.url)
+        backend.healthy = True
+
+
+async def _probe_backends():
+    while True:
+        await asyncio.gather(*(_probe(b) for b in _backends))
+        await asyncio.sleep(settings.OLLAMA_HEALTH_INTERVAL_SECONDS)
+
+
+def _pick_backend(exclude=()) -> Backend:
+    """The least-loaded available backend, relative to its weight.
+
+    An ejected backend becomes eligible again once its delay has passed; if
+    every backend is down, the one whose ejection ends first is tried anyway.
+    """
+    now = time.monotonic()
+    candidates = [b for b in _get_backends() if b not in exclude]
+    available = [b for b in candidates if b.available(now)]
+    if not available:
+        return min(candidates, key=lambda b: (not b.healthy, b.ejected_until))
+    return min(available, key=lambda b: (b.in_flight + 1) / b.weight)
+
+
+def _record_failure(backend: Backend, error: Exception) -> bool:
+    """Eject backend if error is its fault; True if the request never reached it."""
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code >= 500:
+            backend.eject(error)
+        return False
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        backend.eject(error)
+        return True
+    if isinstance(error, httpx.TransportError):
+        backend.eject(error)
+    return False
+
+
+class ErrorMessage(str):
+    """Text returned or streamed in place of a reply when Ollama fails."""
+
+
+def _build_messages(messages, system_context=""):
+    # The system prompt leads so its (mostly static) prefix is shared between
+    # turns; Ollama only re-prefills from the first token that differs.
     ollama_messages = []
     if system_context:
         ollama_messages.append({"role": "system", "content": system_context})
 
     ollama_messages.extend(messages)
+    return ollama_messages
+
 
+def _payload(messages, stream: bool, model: str, tools=None) -> dict:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        # Keep the model (and its KV cache) resident between turns
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+    }
+    if tools:
+        payload["tools"] = tools
+    options = _options()
+    if options:
+        payload["options"] = options
+    return payload
+
+
+def _options() -> dict:
+    options = {}
+    if settings.OLLAMA_NUM_CTX:
+        options["num_ctx"] = settings.OLLAMA_NUM_CTX
+    if settings.OLLAMA_NUM_PREDICT:
+        options["num_predict"] = settings.OLLAMA_NUM_PREDICT
+    return options
+
+
+def generation_identity() -> dict:
+    """What besides the messages decides a reply: the models and their options."""
+    return {"models": sorted({b.model for b in _get_backends()}), "options": _options()}
+
+
+async def _warm(backend: Backend):
     try:
-        async with httpx.AsyncClient(timeout=120) as client:
-            resp = await client.post(
-                f"{base_url}/api/chat",
-                json={
-                    "model": model,
-                    "messages": ollama_messages,
-                    "stream": False,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("message", {}).get("content", "No response from AI.")
+        resp = await backend.client.post(
+            "/api/chat", json=_payload([], stream=False, model=backend.model)
+        )
+        resp.raise_for_status()
+        logger.info("Ollama model %s loaded on %s", backend.model, backend.url)
+    except Exception as e:
+        logger.warning("Could not warm Ollama model %s on %s: %s", backend.model, backend.url, e)
+
+
+async def warm_ollama_model():
+    """Load the model into memory on every backend ahead of the first chat turn.
+
+    An empty message list makes Ollama load the model and return immediately.
+    """
+    await asyncio.gather(*(_warm(b) for b in _get_backends()))
+
+
+def _round_tools(tools, round_no: int):
+    # The last round goes without tools so the model has to answer
+    return tools if round_no < settings.OLLAMA_MAX_TOOL_ROUNDS else None
+
+
+async def _append_tool_results(ollama_messages, content, tool_calls, run_tool):
+    """Record the model's tool calls and their results for the next round."""
+    ollama_messages.append({"role": "assistant", "content": content, "tool_calls": tool_calls})
+    for call in tool_calls:
+        function = call.get("function", {})
+        name = function.get("name", "")
+        arguments = function.get("arguments") or {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except json.JSONDecodeError:
+                arguments = {}
+        result = await run_tool(name, arguments)
+        ollama_messages.append({"role": "tool", "content": result, "tool_name": name})
+
+
+async def _complete_on(backend: Backend, ollama_messages, tools, run_tool) -> str:
+    round_no = 0
+    while True:
+        round_tools = _round_tools(tools, round_no)
+        resp = await backend.client.post(
+            "/api/chat",
+            json=_payload(ollama_messages, stream=False, model=backend.model, tools=round_tools),
+        )
+        resp.raise_for_status()
+        message = resp.json().get("message", {})
+        tool_calls = message.get("tool_calls")
+        if not (round_tools and tool_calls):
+            return message.get("content", "")
+        await _append_tool_results(ollama_messages, message.get("content", ""), tool_calls, run_tool)
+        round_no += 1
+
+
+async def complete_ollama(messages, system_context="", tools=None, run_tool=None) -> str:
+    """Non-streaming chat completion; raises on transport or HTTP errors.
+
+    With tools, each tool call the model makes is answered through
+    run_tool(name, arguments) and the model is asked again, for at most
+    OLLAMA_MAX_TOOL_ROUNDS rounds. A backend that can't be reached is ejected
+    and the request goes to the next one.
+    """
+    ollama_messages = _build_messages(messages, system_context)
+    tried = []
+    while True:
+        backend = _pick_backend(tried)
+        backend.requests += 1
+        backend.in_flight += 1
+        try:
+            return await _complete_on(backend, ollama_messages, tools, run_tool)
+        except Exception as e:
+            tried.append(backend)
+            if not _record_failure(backend, e) or len(tried) == len(_backends):
+                raise
+        finally:
+            backend.in_flight -= 1
+
+
+async def get_ollama_response(messages, system_context="", tools=None, run_tool=None):
+    model = settings.OLLAMA_MODEL
+
+    try:
+        reply = await complete_ollama(messages, system_context, tools, run_tool)
+        return reply or ErrorMessage("No response from AI.")
     except httpx.ConnectError:
-        return (
+        return ErrorMessage(
             "Could not connect to Ollama. "
             "Make sure Ollama is running (ollama serve) "
             f"and a model is pulled (ollama pull {model})."
         )
     except Exception as e:
-        return f"AI error: {str(e)}"
+        return ErrorMessage(f"AI error: {str(e)}")
 
 
-async def stream_ollama_response(messages, system_context=""):
-    """Async generator that yields content tokens from Ollama's streaming API."""
-    base_url = settings.OLLAMA_BASE_URL
-    model = settings.OLLAMA_MODEL
+async def _stream_on(backend: Backend, ollama_messages, tools, run_tool):
+    round_no = 0
+    while True:
+        round_tools = _round_tools(tools, round_no)
+        content, tool_calls = [], []
+        async with backend.client.stream(
+            "POST",
+            "/api/chat",
+            json=_payload(ollama_messages, stream=True, model=backend.model, tools=round_tools),
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                message = chunk.get("message", {})
+                token = message.get("content", "")
+                if token:
+                    content.append(token)
+                    yield token
+                tool_calls.extend(message.get("tool_calls") or [])
+                if chunk.get("done"):
+                    break
 
-    ollama_messages = []
-    if system_context:
-        ollama_messages.append({"role": "system", "content": system_context})
+        if not (round_tools and tool_calls):
+            return
+        await _append_tool_results(ollama_messages, "".join(content), tool_calls, run_tool)
+        round_no += 1
 
-    ollama_messages.extend(messages)
+
+async def stream_ollama_response(messages, system_context="", tools=None, run_tool=None):
+    """Async generator that yields content tokens from Ollama's streaming API.
+
+    Tool calls are handled as in complete_ollama(); text the model streams
+    around its tool calls is passed through as it arrives. Failing over to
+    another backend only happens before the first token.
+    """
+    model = settings.OLLAMA_MODEL
+    ollama_messages = _build_messages(messages, system_context)
+    tried = []
 
     try:
-        async with httpx.AsyncClient(timeout=120) as client:
-            async with client.stream(
-                "POST",
-                f"{base_url}/api/chat",
-                json={
-                    "model": model,
-                    "messages": ollama_messages,
-                    "stream": True,
-                },
-            ) as resp:
-                resp.raise_for_status()
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    try:
-                        chunk = json.loads(line)
-                        content = chunk.get("message", {}).get("content", "")
-                        if content:
-                            yield content
-                        if chunk.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
+        while True:
+            backend = _pick_backend(tried)
+            backend.requests += 1
+            backend.in_flight += 1
+            started = False
+            try:
+                async for token in _stream_on(backend, ollama_messages, tools, run_tool):
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                tried.append(backend)
+                if started or not _record_failure(backend, e) or len(tried) == len(_backends):
+                    raise
+            finally:
+                backend.in_flight -= 1
     except httpx.ConnectError:
-        yield (
+        yield ErrorMessage(
             "Could not connect to Ollama. "
             "Make sure Ollama is running (ollama serve) "
             f"and a model is pulled (ollama pull {model})."
         )
     except Exception as e:
-        yield f"AI error: {str(e)}"
+        yield ErrorMessage(f"AI error: {str(e)}")
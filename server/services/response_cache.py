@@ -0,0 +1,113 @@
+"""
+Opt-in, process-local cache of complete LLM replies for repeated prompts.
+
+A reply is keyed on a hash of the model(s), generation options, the system
+context and the trimmed message list sent to Ollama. The system context is
+assembled from the context cache's sections, so the key changes as soon as any
+section is invalidated and rebuilt; retrieved passages are part of the messages.
+Entries leave in LRU order once RESPONSE_CACHE_MAX_BYTES is exceeded and expire
+after RESPONSE_CACHE_TTL_SECONDS.
+
+Only finished replies are stored: not truncated streams, not error messages,
+and not tool-mode replies, whose data is fetched during generation.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+
+from server.config import settings
+from server.services.ollama_service import generation_identity
+
+# key -> (reply, stored_at monotonic), least recently used first
+_entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+def _size(key: str, reply: str) -> int:
+    return len(key) + len(reply.encode())
+
+
+def cache_key(messages, system_context: str) -> str | None:
+    """Key for this prompt, or None when the cache is off."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    blob = json.dumps(
+        [generation_identity(), system_context, messages],
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _drop(key: str):
+    global _bytes
+    reply, _ = _entries.pop(key)
+    _bytes -= _size(key, reply)
+
+
+def get(key: str | None) -> str | None:
+    if key is None:
+        return None
+    entry = _entries.get(key)
+    if entry is not None and time.monotonic() - entry[1] > settings.RESPONSE_CACHE_TTL_SECONDS:
+        _drop(key)
+        _stats["expired"] += 1
+        entry = None
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+    _entries.move_to_end(key)
+    _stats["hits"] += 1
+    return entry[0]
+
+
+def put(key: str | None, reply: str):
+    global _bytes
+    if key is None or not reply:
+        return
+    size = _size(key, reply)
+    if size > settings.RESPONSE_CACHE_MAX_BYTES:
+        return
+    if key in _entries:
+        _drop(key)
+    _entries[key] = (reply, time.monotonic())
+    _bytes += size
+    _stats["stores"] += 1
+    while _bytes > settings.RESPONSE_CACHE_MAX_BYTES:
+        _drop(next(iter(_entries)))
+        _stats["evictions"] += 1
+
+
+def clear():
+    global _bytes
+    _entries.clear()
+    _bytes = 0
+
+
+def cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hitRate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": len(_entries),
+        "bytes": _bytes,
+        "maxBytes": settings.RESPONSE_CACHE_MAX_BYTES,
+    }
+
+
+async def replay(reply: str):
+    """Yield a cached reply word by word at RESPONSE_CACHE_REPLAY_WORDS_PER_SECOND (0 = at once)."""
+    rate = settings.RESPONSE_CACHE_REPLAY_WORDS_PER_SECOND
+    if rate <= 0:
+        yield reply
+        return
+    for i, chunk in enumerate(_CHUNK.findall(reply)):
+        if i:
+            await asyncio.sleep(1 / rate)
+        yield chunk
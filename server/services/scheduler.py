@@ -5,6 +5,8 @@ APScheduler-based background tasks for calendar notifications.
   whose start time minus reminder_minutes falls within the current minute.
 - send_daily_schedules: runs every minute, checks if any user's configured
   reminder_time matches the current hour:minute and sends their daily schedule.
+- memorize_finished_sessions: runs every CHAT_MEMORY_JOB_MINUTES, turns idle
+  chat sessions into long-term memories (see chat_memory).
 """
 
 import logging
@@ -13,11 +15,14 @@ from datetime import datetime, timedelta, timezone, time as dt_time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy import select, and_
 
+from server.config import settings
 from server.database import AsyncSessionLocal
+from server.query_stats import instrumented
 from server.models.calendar_event import CalendarEvent
 from server.models.notification_preference import NotificationPreference
 from server.models.user import User
 from server.services.novu_service import trigger_event_reminder, trigger_daily_schedule
+from server.services.chat_memory import memorize_finished_sessions
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +39,9 @@ async def check_event_reminders():
         try:
             # Find events with reminders set, where start - reminder_minutes is within the current minute window
             result = await db.execute(
-                select(CalendarEvent, User)
+                select(CalendarEvent, User, NotificationPreference.calendar_reminders_enabled)
                 .join(User, CalendarEvent.user_id == User.id)
+                .outerjoin(NotificationPreference, NotificationPreference.user_id == User.id)
                 .where(
                     and_(
                         CalendarEvent.reminder_minutes.isnot(None),
@@ -46,17 +52,11 @@ async def check_event_reminders():
             )
             rows = result.all()
 
-            for event, user in rows:
+            for event, user, reminders_enabled in rows:
                 reminder_time = event.start - timedelta(minutes=event.reminder_minutes)
                 if window_start <= reminder_time <= window_end:
-                    # Check if user has calendar reminders enabled
-                    prefs_result = await db.execute(
-                        select(NotificationPreference).where(
-                            NotificationPreference.user_id == user.id
-                        )
-                    )
-                    prefs = prefs_result.scalar_one_or_none()
-                    if prefs and not prefs.calendar_reminders_enabled:
+                    # Users without preferences get reminders; skip those who turned them off
+                    if reminders_enabled is False:
                         continue
 
                     try:
@@ -146,8 +146,12 @@ async def send_daily_schedules():
 
 def start_scheduler():
     """Configure and start the APScheduler."""
-    scheduler.add_job(check_event_reminders, "interval", minutes=1, id="event_reminders")
-    scheduler.add_job(send_daily_schedules, "interval", minutes=1, id="daily_schedules")
+    scheduler.add_job(instrumented(check_event_reminders), "interval", minutes=1, id="event_reminders")
+    scheduler.add_job(instrumented(send_daily_schedules), "interval", minutes=1, id="daily_schedules")
+    scheduler.add_job(
+        instrumented(memorize_finished_sessions), "interval",
+        minutes=settings.CHAT_MEMORY_JOB_MINUTES, id="chat_memories",
+    )
     scheduler.start()
     logger.info("Notification scheduler started")
 
@@ -0,0 +1,75 @@
+"""
+Server-sent event framing for the chat stream.
+
+Ollama emits one chunk per token, and writing each one as its own SSE frame
+means a json.dumps and a socket write per token. coalesced_frames() batches
+consecutive tokens into one {"token": ...} frame, flushed every
+SSE_FLUSH_INTERVAL_MS or once SSE_FLUSH_MAX_CHARS have built up, whichever
+comes first. The first token is sent straight away so time-to-first-token does
+not pay the interval, and a ": ping" comment goes out after
+SSE_HEARTBEAT_SECONDS of silence to keep proxies from closing idle streams.
+
+Set SSE_FLUSH_INTERVAL_MS to 0 to send one frame per token.
+"""
+
+import asyncio
+import json
+
+from server.config import settings
+
+
+def sse_event(data: dict) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+HEARTBEAT = ": ping\n\n"
+
+
+async def coalesced_frames(events: asyncio.Queue):
+    """Yield SSE frames for the event dicts on events until a None arrives."""
+    loop = asyncio.get_running_loop()
+    interval = settings.SSE_FLUSH_INTERVAL_MS / 1000
+    max_chars = settings.SSE_FLUSH_MAX_CHARS
+    pending: list[str] = []
+    pending_chars = 0
+    deadline = 0.0
+    sent_token = False
+
+    def flush():
+        nonlocal pending_chars
+        frame = sse_event({"token": "".join(pending)})
+        pending.clear()
+        pending_chars = 0
+        return frame
+
+    while True:
+        # Drain whatever is already queued before paying for a timed wait
+        try:
+            event = events.get_nowait()
+        except asyncio.QueueEmpty:
+            timeout = deadline - loop.time() if pending else settings.SSE_HEARTBEAT_SECONDS
+            try:
+                event = await asyncio.wait_for(events.get(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                yield flush() if pending else HEARTBEAT
+                continue
+
+        if event is None:
+            if pending:
+                yield flush()
+            return
+
+        token = event.get("token") if len(event) == 1 else None
+        if token is None:
+            if pending:
+                yield flush()
+            yield sse_event(event)
+            continue
+
+        if not pending:
+            deadline = loop.time() + interval
+        pending.append(token)
+        pending_chars += len(token)
+        if not sent_token or pending_chars >= max_chars or loop.time() >= deadline:
+            sent_token = True
+            yield flush()
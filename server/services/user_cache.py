@@ -0,0 +1,100 @@
+"""
+Process-local cache of the users resolved by get_current_user.
+
+Entries hold the user's column values, keyed by user id, and are dropped:
+
+- when a router that writes the user row calls invalidate_user() and the
+  request's transaction commits,
+- after USER_CACHE_TTL_SECONDS, so other workers pick up changes within the
+  TTL. That includes users.token_version, bumped by a password change or reset
+  to revoke older tokens: the TTL is how long another worker can still accept
+  a revoked token, which is why it is kept to seconds,
+- in LRU order once there are more than USER_CACHE_MAX_ENTRIES.
+
+A hit is attached to the request's session without a query, so routes can
+still modify the user and flush as usual.
+"""
+
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from server.config import settings
+from server.models.user import User
+
+# user_id -> (column values, stored_at monotonic), least recently used first
+_cache: OrderedDict[int, tuple[dict, float]] = OrderedDict()
+# Bumped on every invalidation so a load that raced with a write is not stored
+_generation = 0
+_stats = {"hits": 0, "misses": 0}
+
+_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+def generation() -> int:
+    return _generation
+
+
+def get_user(db: AsyncSession, user_id: int) -> User | None:
+    """Return the cached user attached to db, or None on a miss."""
+    entry = _cache.get(user_id)
+    if entry is not None and time.monotonic() - entry[1] > settings.USER_CACHE_TTL_SECONDS:
+        del _cache[user_id]
+        entry = None
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+    _cache.move_to_end(user_id)
+    _stats["hits"] += 1
+
+    user = User(**entry[0])
+    make_transient_to_detached(user)
+    return db.sync_session.merge(user, load=False)
+
+
+def store_user(user: User, loaded_at_generation: int):
+    """Cache a user loaded from the database, unless it was invalidated meanwhile."""
+    if settings.USER_CACHE_TTL_SECONDS <= 0 or loaded_at_generation != _generation:
+        return
+    _cache[user.id] = ({key: getattr(user, key) for key in _COLUMNS}, time.monotonic())
+    _cache.move_to_end(user.id)
+    while len(_cache) > settings.USER_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def drop_user(user_id: int):
+    global _generation
+    _generation += 1
+    _cache.pop(user_id, None)
+
+
+def invalidate_user(db: AsyncSession, user_id: int):
+    """Forget a user now and again once the current transaction on db commits.
+
+    The second drop covers a request that read the old row before our commit.
+    """
+    drop_user(user_id)
+    db.sync_session.info.setdefault("stale_users", set()).add(user_id)
+
+
+def cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hitRate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": len(_cache),
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session):
+    for user_id in session.info.pop("stale_users", ()):
+        drop_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop("stale_users", None)
@@ -0,0 +1,85 @@
+"""
+Shared fixtures. Tests run the app in-process against a throwaway SQLite
+database (aiosqlite), so the environment is set up before anything imports
+server.database.
+"""
+
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="quorex-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/test.db"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["EMBEDDING_INDEX_DIR"] = os.path.join(_tmp, "embeddings")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["OLLAMA_WARM_ON_STARTUP"] = "false"
+
+import httpx
+import pytest
+
+from server.database import engine
+from server.main import app
+from server.models.base import Base
+from server.query_stats import query_budget as _query_budget
+from server.services import (
+    chat_history, chat_prewarm, context_cache, embedding_index, response_cache, user_cache,
+)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    # One event loop for the whole run, as in the app: module-level asyncio
+    # primitives (semaphores, the LLM scheduler) bind to the first loop they use
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def _shared_event_loop(anyio_backend):
+    # anyio keeps its runner, and so the loop, open while a session-scoped
+    # async fixture is active
+    yield
+
+
+def _reset_process_caches():
+    # Ids restart with every fresh schema, so nothing cached may carry over
+    context_cache._cache.clear()
+    chat_history._recent.clear()
+    user_cache._cache.clear()
+    response_cache.clear()
+    embedding_index._indexes.clear()
+    chat_prewarm._fresh_until.clear()
+
+
+@pytest.fixture
+async def db_schema(tmp_path, monkeypatch):
+    """Empty tables and caches for each test."""
+    monkeypatch.setattr(embedding_index.settings, "EMBEDDING_INDEX_DIR", str(tmp_path / "embeddings"))
+    _reset_process_caches()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(db_schema):
+    """In-process API client signed in as a freshly registered user."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.post(
+            "/api/auth/register",
+            json={"name": "Test", "email": "test@example.com", "password": "secret1"},
+        )
+        resp.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {resp.json()['token']}"
+        yield client
+
+
+@pytest.fixture
+def query_budget():
+    """Fail a block that runs more SQL than budgeted (see server.query_stats):
+
+        with query_budget(6, max_repeats=1):
+            await client.get("/api/habits/week")
+    """
+    return _query_budget
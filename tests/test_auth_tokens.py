@@ -0,0 +1,67 @@
+"""Access token revocation: password changes revoke tokens, rehashing doesn't (user-022),
+and other workers stop accepting revoked tokens within USER_CACHE_TTL_SECONDS (user-021)."""
+
+import asyncio
+
+import pytest
+
+from server.config import settings
+from server.services import user_cache
+
+
+async def _login(client, password="secret1") -> str:
+    resp = await client.post("/api/auth/login", json={"email": "test@example.com", "password": password})
+    resp.raise_for_status()
+    return resp.json()["token"]
+
+
+async def _profile_status(client, token: str) -> int:
+    resp = await client.get("/api/users/profile", headers={"Authorization": f"Bearer {token}"})
+    return resp.status_code
+
+
+@pytest.mark.anyio
+async def test_rehash_on_login_keeps_other_sessions(client, monkeypatch):
+    other_session = client.headers["Authorization"].split()[1]
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", settings.BCRYPT_ROUNDS + 1)
+
+    token = await _login(client)
+    assert await _profile_status(client, other_session) == 200
+    assert await _profile_status(client, token) == 200
+
+
+@pytest.mark.anyio
+async def test_password_change_revokes_older_tokens(client):
+    old = client.headers["Authorization"].split()[1]
+    resp = await client.post(
+        "/api/users/change-password", json={"currentPassword": "secret1", "newPassword": "secret2"}
+    )
+    resp.raise_for_status()
+
+    assert await _profile_status(client, old) == 401
+    assert await _profile_status(client, resp.json()["token"]) == 200
+    assert await _profile_status(client, await _login(client, "secret2")) == 200
+
+
+@pytest.mark.anyio
+async def test_token_revoked_on_another_worker_within_the_cache_ttl(client, monkeypatch):
+    monkeypatch.setattr(settings, "USER_CACHE_TTL_SECONDS", 0.3)
+    old = client.headers["Authorization"].split()[1]
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    # What another worker has cached from serving this token
+    other_worker_entry = user_cache._cache[user_id]
+
+    resp = await client.post(
+        "/api/users/change-password", json={"currentPassword": "secret1", "newPassword": "secret2"}
+    )
+    resp.raise_for_status()
+    assert await _profile_status(client, old) == 401  # on the worker that made the change
+
+    user_cache._cache[user_id] = other_worker_entry
+    assert await _profile_status(client, old) == 200  # the documented revocation window
+    await asyncio.sleep(settings.USER_CACHE_TTL_SECONDS)
+    assert await _profile_status(client, old) == 401
+
+
+def test_revocation_window_defaults_to_seconds():
+    assert 0 < type(settings)().USER_CACHE_TTL_SECONDS <= 5
@@ -0,0 +1,90 @@
+"""Chat history windows: summaries (user-004) and the recent-turns cache (user-013)."""
+
+import pytest
+from sqlalchemy import update
+
+from server.database import AsyncSessionLocal
+from server.models.chat_message import ChatMessage, ChatSession, ChatSessionSummary
+from server.services import chat_history
+from server.services.chat_history import load_history, save_chat_message
+
+
+async def _interleaved_turns(user_id: int, turns: int) -> list[int]:
+    """Save turns to session "a", each followed by one in "b"; return a's ids."""
+    ids = []
+    async with AsyncSessionLocal() as db:
+        for i in range(turns):
+            message = await save_chat_message(db, user_id, "a", "user", f"turn {i} " + "x" * 40)
+            await save_chat_message(db, user_id, "b", "user", "elsewhere")
+            await db.flush()
+            ids.append(message.id)
+        await db.commit()
+    return ids
+
+
+@pytest.mark.anyio
+async def test_up_to_date_summary_is_not_refreshed(client, monkeypatch):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    ids = await _interleaved_turns(user_id, 6)
+    scheduled = []
+    monkeypatch.setattr(chat_history.settings, "CHAT_HISTORY_TOKEN_BUDGET", 20)
+    monkeypatch.setattr(chat_history, "schedule_summary_update", lambda *args: scheduled.append(args))
+
+    async with AsyncSessionLocal() as db:
+        await load_history(db, user_id, "a")
+    # Only the newest turn fits; everything older needs summarizing
+    assert scheduled == [(user_id, "a", ids[-1])]
+
+    async with AsyncSessionLocal() as db:
+        db.add(ChatSessionSummary(
+            user_id=user_id, session_id="a", summary="earlier", summarized_through_id=ids[-2],
+        ))
+        await db.commit()
+    scheduled.clear()
+    async with AsyncSessionLocal() as db:
+        messages = await load_history(db, user_id, "a")
+    # ids[-2] + 1 belongs to session "b", so the summary already covers the gap
+    assert scheduled == []
+    assert messages[0]["content"].endswith("earlier")
+
+
+@pytest.mark.anyio
+async def test_turns_saved_by_another_worker_are_seen(client):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    await _interleaved_turns(user_id, 2)
+    async with AsyncSessionLocal() as db:
+        await load_history(db, user_id, "a")
+    assert (user_id, "a") in chat_history._recent
+
+    # Writes that bypass this worker's after_commit hook, as another worker's would
+    async with AsyncSessionLocal() as db:
+        db.add(ChatMessage(user_id=user_id, session_id="a", role="assistant", content="from elsewhere"))
+        await db.execute(
+            update(ChatSession)
+            .where(ChatSession.user_id == user_id, ChatSession.session_id == "a")
+            .values(message_count=ChatSession.message_count + 1)
+        )
+        await db.commit()
+    async with AsyncSessionLocal() as db:
+        await save_chat_message(db, user_id, "a", "user", "and here")
+        messages = await load_history(db, user_id, "a")
+    assert [m["content"] for m in messages[-2:]] == ["from elsewhere", "and here"]
+
+
+@pytest.mark.anyio
+async def test_cached_turn_reads_no_messages(client, query_budget):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    await _interleaved_turns(user_id, 2)
+    async with AsyncSessionLocal() as db:
+        await save_chat_message(db, user_id, "a", "user", "first")
+        await load_history(db, user_id, "a")
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        # The message INSERT and the chat_sessions upsert, nothing else
+        with query_budget(2) as stats:
+            await save_chat_message(db, user_id, "a", "user", "second")
+            messages = await load_history(db, user_id, "a")
+        await db.commit()
+    assert messages[-1]["content"] == "second"
+    assert not [shape for shape in stats.shapes if shape.lstrip().upper().startswith("SELECT")]
@@ -0,0 +1,94 @@
+"""Memorizing chat sessions (user-020): one worker per session, a bounded set per user."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from server.database import AsyncSessionLocal
+from server.models.chat_message import ChatMemory, ChatSession
+from server.services import chat_memory
+from server.services.chat_history import save_chat_message
+
+
+async def _finished_session(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        await save_chat_message(db, user_id, "s1", "user", "I am training for a 10k in May")
+        await save_chat_message(db, user_id, "s1", "assistant", "Great, let's plan it")
+        await db.commit()
+        return await db.scalar(select(ChatSession.id).where(ChatSession.user_id == user_id))
+
+
+async def _session_state(session_pk: int):
+    async with AsyncSessionLocal() as db:
+        session = await db.get(ChatSession, session_pk)
+        memories = await db.scalar(select(func.count(ChatMemory.id)))
+        return session.memorized_at, session.last_message_at, memories
+
+
+@pytest.mark.anyio
+async def test_concurrent_runs_memorize_a_session_once(client, monkeypatch):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    session_pk = await _finished_session(user_id)
+    calls, release = [], asyncio.Event()
+
+    async def fake_complete(messages, system_prompt):
+        calls.append(messages)
+        if len(calls) == 1:
+            await release.wait()
+        return "- The user is training for a 10k in May"
+
+    monkeypatch.setattr(chat_memory, "complete_ollama", fake_complete)
+    first = asyncio.create_task(chat_memory.memorize_session(session_pk))
+    while not calls:
+        await asyncio.sleep(0.01)
+    # A second worker's run while the first waits on the model
+    await chat_memory.memorize_session(session_pk)
+    release.set()
+    await first
+
+    memorized_at, last_message_at, memories = await _session_state(session_pk)
+    assert len(calls) == 1
+    assert memories == 1
+    assert memorized_at == last_message_at
+
+
+@pytest.mark.anyio
+async def test_failed_run_leaves_the_session_pending(client, monkeypatch):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    session_pk = await _finished_session(user_id)
+
+    async def failing_complete(messages, system_prompt):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(chat_memory, "complete_ollama", failing_complete)
+    await chat_memory.memorize_session(session_pk)
+
+    memorized_at, _, memories = await _session_state(session_pk)
+    assert memorized_at is None
+    assert memories == 0
+
+
+@pytest.mark.anyio
+async def test_memories_are_capped_per_user(client, monkeypatch):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    monkeypatch.setattr(chat_memory.settings, "CHAT_MEMORY_MAX_PER_USER", 3)
+
+    async def two_facts(messages, system_prompt):
+        session = messages[0]["content"].split()[-1]
+        return f"- Fact one from {session}\n- Fact two from {session}"
+
+    monkeypatch.setattr(chat_memory, "complete_ollama", two_facts)
+    for n in range(3):
+        async with AsyncSessionLocal() as db:
+            await save_chat_message(db, user_id, f"s{n}", "user", f"session s{n}")
+            await db.commit()
+            session_pk = await db.scalar(
+                select(ChatSession.id).where(ChatSession.session_id == f"s{n}")
+            )
+        await chat_memory.memorize_session(session_pk)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ChatMemory.content).order_by(ChatMemory.id))
+        kept = result.scalars().all()
+    assert kept == ["Fact two from s1", "Fact one from s2", "Fact two from s2"]
@@ -0,0 +1,30 @@
+"""Chat session listing and cursor paging (user-011)."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server.database import AsyncSessionLocal
+from server.models import ChatSession
+
+
+@pytest.mark.anyio
+async def test_sessions_page_by_cursor(client):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for i in range(5):
+            at = now - timedelta(minutes=i)
+            db.add(ChatSession(
+                user_id=user_id, session_id=f"s{i}", title=f"Chat {i}",
+                started_at=at, last_message_at=at, message_count=2,
+            ))
+        await db.commit()
+
+    resp = await client.get("/api/chat/sessions", params={"limit": 2})
+    assert resp.status_code == 200
+    first = resp.json()
+    assert [s["sessionId"] for s in first] == ["s0", "s1"]
+
+    resp = await client.get("/api/chat/sessions", params={"limit": 10, "before": first[-1]["cursor"]})
+    assert [s["sessionId"] for s in resp.json()] == ["s2", "s3", "s4"]
@@ -0,0 +1,70 @@
+"""Open chat streams must not hold database connections (user-008)."""
+
+import asyncio
+import json
+import socket
+
+import httpx
+import pytest
+
+from bench.fake_ollama import create_app, serve
+from server.config import settings
+from server.database import engine
+from server.main import app
+from server.services import ollama_service
+from server.services.llm_scheduler import llm_scheduler
+
+STREAMS = 8
+TOKENS = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _open_stream(client, started: asyncio.Event) -> int:
+    received = 0
+    async with client.stream("POST", "/api/chat/stream", json={"message": "hello"}) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if line.startswith('data: {"token"'):
+                # Frames carry several tokens once coalesced; count the words
+                received += len(json.loads(line[6:])["token"].split())
+                started.set()
+    return received
+
+
+@pytest.mark.anyio
+async def test_open_streams_hold_no_connections(client, monkeypatch):
+    ollama_port, api_port = _free_port(), _free_port()
+    monkeypatch.setattr(settings, "OLLAMA_BASE_URL", f"http://127.0.0.1:{ollama_port}")
+    monkeypatch.setattr(settings, "OLLAMA_BACKENDS", "")
+    monkeypatch.setattr(llm_scheduler, "max_concurrency", STREAMS)
+    await ollama_service.close_ollama_client()
+
+    # Uvicorn rather than ASGITransport, which buffers whole responses
+    fake, fake_task = await serve(create_app(tokens=TOKENS, tokens_per_second=40), ollama_port)
+    api, api_task = await serve(app, api_port)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{api_port}", headers=client.headers, timeout=30
+        ) as live:
+            started = [asyncio.Event() for _ in range(STREAMS)]
+            streams = [asyncio.create_task(_open_stream(live, e)) for e in started]
+            await asyncio.wait_for(asyncio.gather(*(e.wait() for e in started)), 20)
+
+            samples = []
+            for _ in range(20):
+                samples.append(engine.pool.checkedout())
+                await asyncio.sleep(0.02)
+            assert not any(s.done() for s in streams), "streams finished before sampling ended"
+            assert max(samples) == 0
+
+            assert await asyncio.gather(*streams) == [TOKENS] * STREAMS
+    finally:
+        for server in (api, fake):
+            server.should_exit = True
+        await asyncio.gather(api_task, fake_task)
+        await ollama_service.close_ollama_client()
@@ -0,0 +1,60 @@
+"""Context sections rebuilt across a committed write must not be cached, and the
+cache stays bounded (user-002)."""
+
+import asyncio
+
+import pytest
+
+from server.database import AsyncSessionLocal
+from server.services import context_builder, context_cache
+from server.services.context_cache import invalidate_context
+
+
+@pytest.mark.anyio
+async def test_build_racing_a_write_is_not_cached(client, monkeypatch):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    querying, resume = asyncio.Event(), asyncio.Event()
+    original = dict(context_builder.SECTIONS)["goals"]
+
+    async def slow_goals(db, uid, now):
+        lines = await original(db, uid, now)  # read before the write commits
+        querying.set()
+        await resume.wait()
+        return lines
+
+    monkeypatch.setattr(
+        context_builder, "SECTIONS",
+        tuple((name, slow_goals if name == "goals" else fn) for name, fn in context_builder.SECTIONS),
+    )
+
+    async with AsyncSessionLocal() as db:
+        build = asyncio.create_task(context_builder.build_context(db, user_id))
+        await querying.wait()
+        async with AsyncSessionLocal() as writer:
+            invalidate_context(writer, user_id, "goals")
+            await writer.commit()
+        resume.set()
+        await build
+
+    assert context_cache.get_section(user_id, "goals") is None
+    assert context_cache.get_section(user_id, "notes") is not None
+
+
+def test_generations_are_evicted_with_their_users(monkeypatch):
+    monkeypatch.setattr(context_cache.settings, "CONTEXT_CACHE_MAX_USERS", 3)
+    for user_id in range(1, 11):
+        snapshot = context_cache.generation(user_id, "goals")
+        context_cache.drop_sections(user_id, "goals")
+        context_cache.store_section(user_id, "notes", "n", context_cache.generation(user_id, "notes"))
+        context_cache.store_section(user_id, "goals", "g", snapshot)
+    assert list(context_cache._cache) == [8, 9, 10]
+    assert all(entry.generations == {"goals": 1} for entry in context_cache._cache.values())
+
+
+def test_build_racing_an_eviction_is_not_cached(monkeypatch):
+    monkeypatch.setattr(context_cache.settings, "CONTEXT_CACHE_MAX_USERS", 1)
+    snapshot = context_cache.generation(1, "goals")
+    context_cache.drop_sections(1, "goals")
+    context_cache.generation(2, "goals")  # evicts user 1 and the drop it recorded
+    context_cache.store_section(1, "goals", "stale", snapshot)
+    assert context_cache.get_section(1, "goals") is None
@@ -0,0 +1,64 @@
+"""Embedding indexes shared by worker processes, and kept in step with tag edits (user-014)."""
+
+import asyncio
+
+import pytest
+
+from server.services import embedding_index
+from server.services.embedding_index import _UserIndex, embed
+
+
+def _rows(*docs):
+    rows = [["note", doc_id, text] for doc_id, text in docs]
+    return rows, embed([r[2] for r in rows])
+
+
+def _search(index, text):
+    return index.search(embed([text])[0], 5, 0.1)
+
+
+def test_workers_see_each_others_writes(db_schema):
+    # Two instances of one index stand in for two worker processes
+    first, second = _UserIndex(1), _UserIndex(1)
+    assert not second.ready()
+
+    first.reset(*_rows((1, "marathon training plan")))
+    assert second.ready()
+    assert _search(second, "marathon training") == ["marathon training plan"]
+
+    second.update(set(), *_rows((2, "sourdough bread recipe")))
+    first.update({("note", 1)}, *_rows((3, "tax return checklist")))
+
+    assert _search(second, "sourdough bread") == ["sourdough bread recipe"]
+    assert _search(second, "tax return") == ["tax return checklist"]
+    assert _search(first, "marathon training") == []
+    assert sorted(r[1] for r in first.rows if r) == sorted(r[1] for r in second.rows if r) == [2, 3]
+
+
+def test_rebuild_keeps_other_mappings_readable(db_schema):
+    first, second = _UserIndex(1), _UserIndex(1)
+    first.reset(*_rows((1, "marathon training plan")))
+    assert _search(second, "marathon") == ["marathon training plan"]
+
+    first.reset(*_rows((2, "sourdough bread recipe")))
+    assert _search(second, "sourdough bread") == ["sourdough bread recipe"]
+    assert _search(second, "marathon") == []
+
+
+@pytest.mark.anyio
+async def test_tag_rename_reindexes_notes(client):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    tag = (await client.post("/api/tags", json={"name": "zephyr"})).json()
+    await client.post("/api/notes", json={"title": "Trip", "content": "Packing list", "tags": "zephyr"})
+
+    embedding_index.ensure_index(user_id)
+    while embedding_index._tasks:
+        await asyncio.gather(*embedding_index._tasks)
+    assert await embedding_index.relevant_passages(user_id, "zephyr")
+
+    await client.put(f"/api/tags/{tag['id']}", json={"name": "quokka"})
+    while embedding_index._tasks:
+        await asyncio.gather(*embedding_index._tasks)
+    passages = await embedding_index.relevant_passages(user_id, "quokka")
+    assert passages and "quokka" in passages[0]
+    assert not await embedding_index.relevant_passages(user_id, "zephyr")
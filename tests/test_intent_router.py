@@ -0,0 +1,38 @@
+"""Plain data lookups answered without the LLM, and what must not be (user-016)."""
+
+from datetime import timezone
+
+import pytest
+
+from server.database import AsyncSessionLocal
+from server.models.habit import CustomHabit
+from server.services.intent_router import answer_intent, classify
+
+
+async def _answer(user_id: int, text: str) -> str | None:
+    async with AsyncSessionLocal() as db:
+        return await answer_intent(db, user_id, timezone.utc, text)
+
+
+def test_only_lookups_are_classified():
+    assert classify("what's on my calendar today")[0] == "events_today"
+    assert classify("what's my sleep streak")[0] == "habit_streak"
+    assert classify("what's the weather today") is None
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("text", ["what's my losing streak", "i'm on a winning streak", "what's my meditation streak"])
+async def test_streak_phrasing_without_a_habit_goes_to_the_llm(client, text):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    assert await _answer(user_id, text) is None
+
+
+@pytest.mark.anyio
+async def test_streak_for_a_named_habit_is_answered(client):
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    async with AsyncSessionLocal() as db:
+        db.add(CustomHabit(user_id=user_id, name="Meditation"))
+        await db.commit()
+
+    assert await _answer(user_id, "what's my sleep streak") is not None
+    assert "Meditation" in await _answer(user_id, "what's my meditation streak")
@@ -0,0 +1,107 @@
+"""Dispatch across several Ollama backends, each a bench.fake_ollama copy (user-017)."""
+
+import asyncio
+import json
+import socket
+
+import pytest
+
+from bench.fake_ollama import create_app, serve
+from server.config import settings
+from server.services import ollama_service
+from server.services.ollama_service import complete_ollama, stream_ollama_response, ErrorMessage
+
+HELLO = [{"role": "user", "content": "hi"}]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+async def backends(monkeypatch):
+    """Start fake backends from (weight, app options) pairs; returns their apps, servers and ports."""
+    started = []
+
+    async def start(*specs):
+        ports = [_free_port() for _ in specs]
+        apps = [create_app(tokens=5, tokens_per_second=0, **options) for _, options in specs]
+        for app, port in zip(apps, ports):
+            started.append(await serve(app, port))
+        monkeypatch.setattr(settings, "OLLAMA_BACKENDS", json.dumps([
+            {"url": f"http://127.0.0.1:{port}", "weight": weight}
+            for port, (weight, _) in zip(ports, specs)
+        ]))
+        monkeypatch.setattr(settings, "OLLAMA_HEALTH_INTERVAL_SECONDS", 0.1)
+        monkeypatch.setattr(settings, "OLLAMA_EJECT_SECONDS", 0.3)
+        await ollama_service.close_ollama_client()
+        return apps, started, ports
+
+    yield start
+    await ollama_service.close_ollama_client()
+    for server, task in started:
+        server.should_exit = True
+    await asyncio.gather(*(task for _, task in started))
+
+
+async def _stop(server_and_task):
+    server, task = server_and_task
+    server.should_exit = True
+    await task
+
+
+@pytest.mark.anyio
+async def test_failed_backend_is_ejected_then_retried(backends):
+    apps, servers, ports = await backends((1, {}), (1, {}))
+    await _stop(servers[0])
+
+    # Ties go to the first backend: it fails, is ejected, and the reply comes from the second
+    assert await complete_ollama(HELLO)
+    first, second = ollama_service.backend_stats()
+    assert first["ejected"] and first["failures"] == 1
+    assert await complete_ollama(HELLO)
+    assert ollama_service.backend_stats()[0]["failures"] == 1  # not tried while ejected
+    assert apps[1].state.stats["requests"] == 2
+
+    servers.append(await serve(apps[0], ports[0]))
+    await asyncio.sleep(settings.OLLAMA_EJECT_SECONDS)
+    assert await complete_ollama(HELLO)
+    assert apps[0].state.stats["requests"] == 1
+
+
+@pytest.mark.anyio
+async def test_stream_fails_over_before_the_first_token(backends):
+    apps, servers, _ = await backends((1, {}), (1, {}))
+    await _stop(servers[0])
+
+    tokens = [t async for t in stream_ollama_response(HELLO)]
+    assert not any(isinstance(t, ErrorMessage) for t in tokens)
+    assert "".join(tokens).split() == [f"word{i}" for i in range(5)]
+    assert apps[1].state.stats["requests"] == 1
+
+
+@pytest.mark.anyio
+async def test_stream_does_not_fail_over_after_the_first_token(backends):
+    apps, _, _ = await backends((1, {"drop_rate": 1.0}), (1, {}))
+
+    tokens = [t async for t in stream_ollama_response(HELLO)]
+    assert isinstance(tokens[-1], ErrorMessage)
+    assert apps[1].state.stats["requests"] == 0
+
+
+@pytest.mark.anyio
+async def test_least_loaded_dispatch_follows_weights(backends):
+    apps, _, _ = await backends((3, {"ttft_ms": 200}), (1, {"ttft_ms": 200}))
+
+    # All eight are dispatched before any finishes: in flight ends up 6 to 2
+    await asyncio.gather(*(complete_ollama(HELLO) for _ in range(8)))
+    assert [app.state.stats["requests"] for app in apps] == [6, 2]
+
+
+@pytest.mark.parametrize("weight", [0, -1])
+def test_non_positive_weight_is_rejected(monkeypatch, weight):
+    monkeypatch.setattr(settings, "OLLAMA_BACKENDS", json.dumps([{"url": "http://a", "weight": weight}]))
+    with pytest.raises(ValueError, match="must be positive"):
+        ollama_service._configured_backends()
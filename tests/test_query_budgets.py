@@ -0,0 +1,51 @@
+"""Query budgets for hot endpoints, fixed however much data the user has (user-025)."""
+
+from datetime import date, timedelta
+
+import pytest
+
+
+async def _seed_habits(client, habits: int, days: int):
+    today = date.today()
+    for i in range(habits):
+        resp = await client.post("/api/habits/custom", json={"name": f"Habit {i}"})
+        habit_id = resp.json()["id"]
+        for offset in range(days):
+            day = (today - timedelta(days=offset)).isoformat()
+            await client.put(f"/api/habits/custom-log/{day}/{habit_id}", json={"value": "true"})
+    for offset in range(days):
+        day = (today - timedelta(days=offset)).isoformat()
+        await client.put(f"/api/habits/log/{day}/sleep", json={"hours": 8})
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("habits,days", [(1, 1), (6, 10)])
+async def test_habits_week_budget(client, query_budget, habits, days):
+    await _seed_habits(client, habits, days)
+    await client.get("/api/users/profile")  # resolve the user outside the budget
+
+    with query_budget(6, max_repeats=1):
+        resp = await client.get("/api/habits/week")
+
+    streaks = resp.json()["streaks"]
+    assert streaks["sleep"] == days
+    assert sorted(v for k, v in streaks.items() if k.startswith("custom_")) == [days] * habits
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("habits,days", [(1, 1), (6, 5)])
+async def test_activity_feed_budget(client, query_budget, habits, days):
+    await _seed_habits(client, habits, days)
+    await client.get("/api/users/profile")
+
+    with query_budget(9, max_repeats=1):
+        resp = await client.get("/api/activity-feed")
+
+    assert resp.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_habits_week_takes_a_date(client):
+    resp = await client.get("/api/habits/week", params={"date": "2026-01-07"})
+    assert resp.json()["weekStart"] == "2026-01-05"
+    assert (await client.get("/api/habits/week", params={"date": "soon"})).status_code == 400
@@ -0,0 +1,63 @@
+"""Read-only handlers on a replica, with read-your-writes on the primary (user-024).
+
+Two SQLite files stand in for the primary and the replica. The replica is
+never written by the app, so which one answered shows in what a GET returns.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from server import database
+from server.config import settings
+from server.database import RECENT_WRITE_COOKIE
+from server.models.base import Base
+from server.models.note import Note
+
+
+@pytest.fixture
+async def replica(client, tmp_path, monkeypatch):
+    """Route get_read_db to a separate database holding one note of its own."""
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    user_id = (await client.get("/api/users/profile")).json()["id"]
+    ReplicaSession = async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    async with ReplicaSession() as db:
+        db.add(Note(user_id=user_id, title="On the replica"))
+        await db.commit()
+
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", f"sqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "ReadSessionLocal", ReplicaSession)
+    client.cookies.clear()
+    yield
+    await replica_engine.dispose()
+
+
+async def _note_titles(client) -> list[str]:
+    resp = await client.get("/api/notes")
+    resp.raise_for_status()
+    return [note["title"] for note in resp.json()]
+
+
+@pytest.mark.anyio
+async def test_reads_go_to_the_replica(client, replica):
+    assert await _note_titles(client) == ["On the replica"]
+
+
+@pytest.mark.anyio
+async def test_reads_after_a_write_go_to_the_primary(client, replica):
+    resp = await client.post("/api/notes", json={"title": "On the primary"})
+    assert resp.status_code == 201
+    assert RECENT_WRITE_COOKIE in resp.cookies
+    assert await _note_titles(client) == ["On the primary"]
+
+    client.cookies.clear()  # the cookie expired
+    assert await _note_titles(client) == ["On the replica"]
+
+
+@pytest.mark.anyio
+async def test_failed_write_does_not_pin_to_the_primary(client, replica):
+    resp = await client.post("/api/notes", json={})
+    assert resp.status_code == 422
+    assert RECENT_WRITE_COOKIE not in resp.cookies
+    assert await _note_titles(client) == ["On the replica"]